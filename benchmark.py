@@ -0,0 +1,310 @@
+"""Benchmarks of the hot paths of the wallet and of the client.
+
+    python benchmark.py --output result.json
+    python benchmark.py --baseline result.json --tolerance 0.2
+
+Each benchmark reports percentiles of the seconds one operation takes. With `--baseline`, a
+benchmark whose median is more than `tolerance` slower than in the baseline is reported as a
+regression, and the exit status is 1. Client benchmarks run against a local MockNode.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from libra import Account, AccountConfig
+from libra.account_resource import AccountResource, BalanceResource
+from libra.account_state import AccountState
+from libra.account_state_blob import AccountStateBlob
+from libra.event import EventHandle, EventKey
+from libra.hasher import HashValue
+from libra.proof.definition import TransactionAccumulatorProof, SparseMerkleProof
+from libra.rustlib import count_ones, leading_zeros, next_power_of_two, trailing_zeros
+from libra.proof.merkle_tree import TransactionAccumulatorInternalNode, SparseMerkleInternalNode, SparseMerkleLeafNode
+from libra.transaction import RawTransaction, SignedTransaction, Script, TransactionPayload
+from libra_client.bulk_transfer import BulkTransfer
+from libra_client.client import Client
+from libra_client.key_factory import KeyFactory
+from libra_client.mock_node import MockNode
+from libra_client.stats import summarize
+from libra_client.wallet_library import WalletLibrary
+
+MNEMONIC = ("legal winner thank year wave sausage worth useful legal winner thank year wave sausage worth "
+            "useful legal will")
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def measure(fn, repeat, number=1):
+    """Calls `fn` `repeat` * `number` times, returns percentiles of the seconds per call."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    ret = summarize(samples, (50, 90, 99))
+    ret["ops_per_sec"] = 1 / ret["p50"] if ret["p50"] else None
+    return ret
+
+
+def transfer_txn(account, sequence_number=0):
+    script = Script.gen_transfer_script(Account(bytes([1] * 32)).address, 1)
+    return RawTransaction.new_tx(account.address, sequence_number, TransactionPayload('Script', script))
+
+
+def fold_accumulator(element_hash, index, siblings):
+    hashv = element_hash
+    for sibling in siblings:
+        if index % 2 == 0:
+            hashv = TransactionAccumulatorInternalNode(hashv, sibling).hash()
+        else:
+            hashv = TransactionAccumulatorInternalNode(sibling, hashv).hash()
+        index //= 2
+    return hashv
+
+
+def fold_sparse_merkle(leaf_hash, key, siblings):
+    # Siblings go from the leaf up to the root, the bit of the key at depth d picks the side at level d.
+    hashv = leaf_hash
+    for i, sibling in enumerate(siblings):
+        depth = len(siblings) - 1 - i
+        if key[depth // 8] & (0x80 >> (depth % 8)):
+            hashv = SparseMerkleInternalNode(sibling, hashv).hash()
+        else:
+            hashv = SparseMerkleInternalNode(hashv, sibling).hash()
+    return hashv
+
+
+def account_state_blob(account):
+    resource = AccountResource(
+        account.auth_key, False, False,
+        EventHandle(0, EventKey.new_from_address(account.address, 0)),
+        EventHandle(0, EventKey.new_from_address(account.address, 1)),
+        0, False)
+    balance_path = BalanceResource.access_path_for(AccountConfig.type_tag_for_currency_code(AccountConfig.LBR_NAME))
+    state = AccountState({
+        AccountResource.resource_path(): resource.serialize(),
+        balance_path: BalanceResource(100).serialize(),
+    })
+    return state.serialize()
+
+
+@benchmark("key_factory_private_child")
+def bench_private_child(args):
+    factory = KeyFactory(KeyFactory.to_seed(MNEMONIC))
+    index = iter(range(10 ** 9))
+    return measure(lambda: factory.private_child(next(index)), args.repeat, 10)
+
+
+@benchmark("wallet_library_recover")
+def bench_wallet_recover(args):
+    ret = measure(lambda: WalletLibrary.new_from_mnemonic(MNEMONIC, args.children), max(args.repeat // 10, 3))
+    ret["children"] = args.children
+    return ret
+
+
+@benchmark("raw_transaction_serialize_hash")
+def bench_raw_transaction(args):
+    raw_txn = transfer_txn(Account(bytes(32)))
+    return measure(lambda: (raw_txn.serialize(), raw_txn.hash()), args.repeat, 10)
+
+
+@benchmark("signed_transaction_gen_from_raw_txn")
+def bench_sign(args):
+    account = Account(bytes(32))
+    raw_txn = transfer_txn(account)
+    return measure(lambda: SignedTransaction.gen_from_raw_txn(raw_txn, account), args.repeat, 10)
+
+
+@benchmark("accumulator_proof_verify")
+def bench_accumulator_proof(args):
+    siblings = [HashValue.random_hash() for _ in range(args.depth)]
+    element_hash = HashValue.random_hash()
+    index = 2 ** args.depth // 3
+    root = fold_accumulator(element_hash, index, siblings)
+    proof = TransactionAccumulatorProof(siblings)
+    return measure(lambda: proof.verify(root, element_hash, index), args.repeat, 10)
+
+
+@benchmark("accumulator_proof_verify_batch")
+def bench_accumulator_proof_batch(args):
+    # A page of 64 consecutive leaves, their subtree hangs below random siblings up to the root.
+    page = [HashValue.random_hash() for _ in range(64)]
+    levels = [page]
+    while len(levels[-1]) > 1:
+        nodes = levels[-1]
+        levels.append([TransactionAccumulatorInternalNode(nodes[i], nodes[i + 1]).hash()
+                       for i in range(0, len(nodes), 2)])
+    upper_siblings = [HashValue.random_hash() for _ in range(args.depth - 6)]
+    first_index = 2 ** args.depth // 3 // 64 * 64
+    root = fold_accumulator(levels[-1][0], first_index // 64, upper_siblings)
+    elements = []
+    for i, element_hash in enumerate(page):
+        siblings = [levels[level][(i >> level) ^ 1] for level in range(6)] + upper_siblings
+        elements.append((TransactionAccumulatorProof(siblings), element_hash, first_index + i))
+    ret = measure(lambda: TransactionAccumulatorProof.verify_batch(root, elements), args.repeat)
+    ret["proofs"] = len(elements)
+    return ret
+
+
+@benchmark("sparse_merkle_proof_verify")
+def bench_sparse_merkle_proof(args):
+    blob = AccountStateBlob(account_state_blob(Account(bytes(32))))
+    key = HashValue.random_hash()
+    leaf = SparseMerkleLeafNode(key, blob.hash())
+    siblings = [HashValue.random_hash() for _ in range(args.depth)]
+    root = fold_sparse_merkle(leaf.hash(), key, siblings)
+    proof = SparseMerkleProof(leaf, siblings)
+    return measure(lambda: proof.verify(root, key, blob), args.repeat, 10)
+
+
+@benchmark("rustlib_bit_ops")
+def bench_bit_ops(args):
+    # The calls an accumulator append and the position arithmetic make, over 1000 leaf counts.
+    values = [3 ** i % 2 ** 63 for i in range(1000)]
+
+    def run():
+        for x in values:
+            trailing_zeros(~x)
+            trailing_zeros(x)
+            leading_zeros(x)
+            count_ones(x)
+            next_power_of_two(x)
+
+    ret = measure(run, args.repeat)
+    ret["values"] = len(values)
+    return ret
+
+
+@benchmark("account_state_deserialize")
+def bench_account_state(args):
+    blob = account_state_blob(Account(bytes(32)))
+    return measure(lambda: AccountState.deserialize(blob).get_account_resource(), args.repeat, 10)
+
+
+class MockNetwork:
+    def __init__(self, args):
+        self.node = MockNode(latency=args.latency)
+        self.faucet_file = tempfile.NamedTemporaryFile(suffix=".key", delete=False)
+        self.faucet_file.write(bytes([32]) + bytes([9] * 32))
+        self.faucet_file.close()
+
+    def __enter__(self):
+        self.node.start()
+        self.client = Client.new(self.node.url, self.faucet_file.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.client.close()
+        self.node.stop()
+        os.unlink(self.faucet_file.name)
+
+    def new_account(self, seed, amount=10 ** 12):
+        account = Account(bytes([seed] * 32))
+        self.node.ledger.mint(account.address, amount, account.auth_key)
+        return account
+
+
+@benchmark("client_get_account_state")
+def bench_client_read(args):
+    with MockNetwork(args) as network:
+        account = network.new_account(1)
+        return measure(lambda: network.client.get_account_state(account.address), args.repeat, 10)
+
+
+@benchmark("client_submit")
+def bench_client_submit(args):
+    with MockNetwork(args) as network:
+        sender = network.new_account(1)
+        receiver = network.new_account(2)
+        return measure(lambda: network.client.transfer_coin(sender, receiver.address, 1), args.repeat, 10)
+
+
+@benchmark("client_bulk_transfer")
+def bench_bulk_transfer(args):
+    with MockNetwork(args) as network:
+        senders = [network.new_account(i + 1) for i in range(4)]
+        receiver = network.new_account(100)
+        bulk = BulkTransfer(network.client)
+        transfers = [(senders[i % len(senders)], receiver.address, 1) for i in range(args.transfers)]
+
+        def run():
+            results = list(bulk.run(transfers))
+            assert all(x.success for x in results), [x.error for x in results if not x.success][:1]
+
+        ret = measure(run, max(args.repeat // 20, 3))
+        ret["transfers"] = args.transfers
+        ret["transfers_per_sec"] = args.transfers / ret["p50"]
+        return ret
+
+
+def compare(results, baseline, tolerance):
+    """Returns the names of the benchmarks whose median regressed against `baseline`."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("p50"):
+            continue
+        ratio = result["p50"] / base["p50"]
+        result["baseline_p50"] = base["p50"]
+        result["ratio"] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="*", help="benchmarks to run, all by default: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=100, help="samples per benchmark")
+    parser.add_argument("--children", type=int, default=20, help="children recovered by wallet_library_recover")
+    parser.add_argument("--depth", type=int, default=32, help="number of siblings of the verified proofs")
+    parser.add_argument("--transfers", type=int, default=200, help="transfers per client_bulk_transfer run")
+    parser.add_argument("--latency", type=float, default=0, help="latency of the mock node, in seconds")
+    parser.add_argument("--output", help="write the json report to this file instead of stdout")
+    parser.add_argument("--baseline", help="json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    unknown = [x for x in args.names if x not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": int(time.time()),
+        "results": {},
+    }
+    for name in args.names or BENCHMARKS:
+        print(f"running {name}", file=sys.stderr)
+        report["results"][name] = BENCHMARKS[name](args)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report["results"], json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    data = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(data)
+    else:
+        print(data)
+    for name in regressions:
+        result = report["results"][name]
+        print(f"regression: {name} p50 {result['p50']:.6f}s is {result['ratio']:.2f}x the baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
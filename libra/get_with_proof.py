@@ -9,6 +9,7 @@ from libra.proof.transaction_with_proof import TransactionWithProof
 from libra.proof.transaction_list_with_proof import TransactionListWithProof
 from libra.proof.account_state_with_proof import AccountStateWithProof
 from libra.proof.event_with_proof import EventWithProof
+from libra.proof.definition import AccumulatorBatchVerifier
 from libra.transaction import SignedTransaction, TransactionInfo
 from libra.account_address import Address
 from libra.access_path import AccessPath
@@ -321,6 +322,7 @@ def verify_get_events_by_access_path_resp(
         len(events_with_proof)
     )
     if expected_event_key_opt is not None:
+        verifier = AccumulatorBatchVerifier(TransactionAccumulatorHasher, ledger_info.transaction_accumulator_hash)
         zipped = zip(events_with_proof, expected_seq_nums)
         for event_with_proof, seq_num in zipped:
             event_with_proof.verify(
@@ -328,7 +330,8 @@ def verify_get_events_by_access_path_resp(
                 expected_event_key_opt,
                 seq_num,
                 event_with_proof.transaction_version,
-                event_with_proof.event_index
+                event_with_proof.event_index,
+                verifier
             )
     elif events_with_proof:
         bail("Bad events_with_proof: nonempty event list for nonexistent account")
@@ -22,8 +22,12 @@ def sha3_256_mod():
         return sha3.sha3_256
 
 
+# Resolved once, instead of on every new hasher.
+SHA3_256 = sha3_256_mod()
+
+
 def new_sha3_256():
-    return sha3_256_mod()()
+    return SHA3_256()
 
 
 LIBRA_HASH_PREFIX = b"LIBRA::"
@@ -68,20 +72,14 @@ def bytes_to_bits(abytes):
 
 
 def bytes_to_bools(abytes):
-    ret = []
-    for x in abytes:
-        ret.extend(uint8_to_bools(x))
-    return ret
+    bits = int.from_bytes(bytes(abytes), 'big')
+    return [bool(bits >> x & 1) for x in reversed(range(len(abytes) * 8))]
 
 
 def common_prefix_bits_len(bytes1, bytes2):
     assert len(bytes1) == len(bytes2)
-    bit_str1 = ''.join([uint8_to_bits(x) for x in bytes1])
-    bit_str2 = ''.join([uint8_to_bits(x) for x in bytes2])
-    for idx, bit in enumerate(bit_str1):
-        if bit != bit_str2[idx]:
-            return idx
-    return len(bit_str1)
+    diff = int.from_bytes(bytes(bytes1), 'big') ^ int.from_bytes(bytes(bytes2), 'big')
+    return len(bytes1) * 8 - diff.bit_length()
 
 
 def hash_seed(clazz_name):
@@ -90,11 +88,38 @@ def hash_seed(clazz_name):
     return sha3.digest()
 
 
+# Sha3 states already fed with the salt of their domain name, see `hasher_state`.
+HASHER_STATES = {}
+
+
+def hasher_state(name_in_bytes):
+    """Returns the sha3 state seeded with the salt of `name_in_bytes`, computed once per name.
+    It is shared, so it must not be updated: hash with a `.copy()` of it.
+    """
+    state = HASHER_STATES.get(name_in_bytes)
+    if state is None:
+        state = new_sha3_256()
+        state.update(hash_seed(name_in_bytes))
+        state = HASHER_STATES.setdefault(name_in_bytes, state)
+    return state
+
+
 def gen_hasher(name_in_bytes):
-    salt = hash_seed(name_in_bytes)
-    shazer = new_sha3_256()
-    shazer.update(salt)
-    return shazer
+    return hasher_state(name_in_bytes).copy()
+
+
+# Initial states of hasher functions like TransactionAccumulatorHasher, see `hasher_state_of`.
+HASHER_FUNCTION_STATES = {}
+
+
+def hasher_state_of(hasher):
+    """Returns the state the hasher function `hasher` starts from, computed once per function.
+    Like `hasher_state`, it is shared and must only be copied.
+    """
+    state = HASHER_FUNCTION_STATES.get(hasher)
+    if state is None:
+        state = HASHER_FUNCTION_STATES.setdefault(hasher, hasher())
+    return state
 
 
 def EventAccumulatorHasher():
@@ -4,7 +4,8 @@ from libra.proof.merkle_tree import (
 from libra.proof.definition import (
     AccumulatorProof, SparseMerkleProof, SparseMerkleRangeProof, MAX_ACCUMULATOR_PROOF_DEPTH, AccumulatorRangeProof,
     AccumulatorConsistencyProof, TransactionAccumulatorProof, TransactionAccumulatorRangeProof,
-    EventAccumulatorProof, AccountStateProof, EventProof, TransactionProof, TransactionListProof
+    EventAccumulatorProof, AccountStateProof, EventProof, TransactionProof, TransactionListProof,
+    AccumulatorBatchVerifier
 )
 from libra.proof.account_state_with_proof import AccountStateWithProof
 from libra.proof.event_with_proof import EventWithProof
@@ -33,7 +33,8 @@ class AccountStateWithProof:
         self,
         ledger_info,
         version,
-        address
+        address,
+        cache=None
     ):
         ensure(
             self.version == version,
@@ -41,7 +42,7 @@ class AccountStateWithProof:
             self.version,
             version
         )
-        self.proof.verify(ledger_info, version, Address.hash(address), self.blob)
+        self.proof.verify(ledger_info, version, Address.hash(address), self.blob, cache)
 
     # Returns the `EventKey` (if existent) and number of total events for
     # an event stream specified by a query path.
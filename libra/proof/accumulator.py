@@ -1,8 +1,8 @@
-from libra.proof.merkle_tree import MerkleTreeInternalNode
+from libra.proof.merkle_tree import hash_internal
 from libra.proof.definition import LeafCount, MAX_ACCUMULATOR_LEAVES
 from libra.rustlib import ensure
 from libra.proof.position import count_ones, trailing_zeros
-from libra.hasher import HashValue, ACCUMULATOR_PLACEHOLDER_HASH
+from libra.hasher import HashValue, ACCUMULATOR_PLACEHOLDER_HASH, hasher_state_of
 from dataclasses import dataclass
 from typing import List
 
@@ -101,11 +101,14 @@ class InMemoryAccumulator:
         # Next, merge the last two subtrees into one. If `num_existing_leaves` has N trailing
         # ones, the carry will happen N times.
         num_trailing_ones = trailing_zeros(~num_existing_leaves)
+        if num_trailing_ones == 0:
+            return
+        state = hasher_state_of(self.__class__.hasher)
 
         for _i in range(num_trailing_ones):
             right_hash = frozen_subtree_roots.pop()
             left_hash = frozen_subtree_roots.pop()
-            parent_hash = MerkleTreeInternalNode(left_hash, right_hash, self.__class__.hasher).hash()
+            parent_hash = hash_internal(state, left_hash, right_hash)
             frozen_subtree_roots.append(parent_hash)
 
     # Appends a list of new subtrees to the existing accumulator. This is similar to
@@ -169,6 +172,7 @@ class InMemoryAccumulator:
         current_num_leaves = self.num_leaves
         remaining_new_leaves = num_new_leaves
         subtree_iter = subtrees.__iter__()
+        state = hasher_state_of(self.__class__.hasher)
 
         # Check if we want to combine a new subtree with the rightmost frozen subtree. To do that
         # this new subtree needs to represent `rightmost_frozen_subtree_size` leaves, so we need
@@ -182,7 +186,7 @@ class InMemoryAccumulator:
             current_hash = subtree_iter.__next__()
             while current_num_leaves & mask != 0:
                 left_hash = current_subtree_roots.pop()
-                current_hash = MerkleTreeInternalNode(left_hash, current_hash, self.__class__.hasher).hash()
+                current_hash = hash_internal(state, left_hash, current_hash)
                 mask <<= 1
             current_subtree_roots.append(current_hash)
             current_num_leaves += rightmost_frozen_subtree_size
@@ -216,20 +220,13 @@ class InMemoryAccumulator:
         bitmap = num_leaves >> trailing_zeros(num_leaves)
         current_hash = ACCUMULATOR_PLACEHOLDER_HASH
         frozen_subtree_iter = reversed(frozen_subtree_roots)
+        state = hasher_state_of(cls.hasher)
 
         while bitmap > 0:
             if bitmap & 1 != 0:
-                current_hash = MerkleTreeInternalNode(
-                    frozen_subtree_iter.__next__(),
-                    current_hash,
-                    cls.hasher
-                ).hash()
+                current_hash = hash_internal(state, frozen_subtree_iter.__next__(), current_hash)
             else:
-                current_hash = MerkleTreeInternalNode(
-                    current_hash,
-                    ACCUMULATOR_PLACEHOLDER_HASH,
-                    cls.hasher
-                ).hash()
+                current_hash = hash_internal(state, current_hash, ACCUMULATOR_PLACEHOLDER_HASH)
             bitmap >>= 1
         return current_hash
 
@@ -1,8 +1,8 @@
 from libra.hasher import (
     HashValue, ACCUMULATOR_PLACEHOLDER_HASH, SPARSE_MERKLE_PLACEHOLDER_HASH,
-    TransactionAccumulatorHasher, EventAccumulatorHasher, TestOnlyHasher,
-    bytes_to_bools, common_prefix_bits_len)
-from libra.proof.merkle_tree import MerkleTreeInternalNode, SparseMerkleLeafNode, SparseMerkleInternalNode
+    TransactionAccumulatorHasher, EventAccumulatorHasher, TestOnlyHasher, SparseMerkleInternalHasher,
+    common_prefix_bits_len, hasher_state_of)
+from libra.proof.merkle_tree import SparseMerkleLeafNode, SparseMerkleHashCache, hash_internal
 from libra.validator_verifier import VerifyError
 from libra.rustlib import ensure, bail
 from libra.proof.mod import verify_transaction_info
@@ -11,6 +11,7 @@ from libra.transaction import TransactionInfo, Version
 from libra.ledger_info import LedgerInfo
 from canoser import Uint64
 from dataclasses import dataclass
+from functools import partial
 from typing import List, Optional
 import more_itertools
 from libra.proto_helper import ProtoHelper
@@ -85,14 +86,15 @@ class AccumulatorProof:
             len(self.siblings)
         )
         index = element_index
-        hashv = element_hash
+        hashv = bytes(element_hash)
+        state = hasher_state_of(self.__class__.hasher)
         for sibling_hash in self.siblings:
             if index % 2 == 0:
                 # the current node is a left child.
-                hashv = MerkleTreeInternalNode(hashv, sibling_hash, self.__class__.hasher).hash()
+                hashv = hash_internal(state, hashv, sibling_hash)
             else:
                 # the current node is a right child.
-                hashv = MerkleTreeInternalNode(sibling_hash, hashv, self.__class__.hasher).hash()
+                hashv = hash_internal(state, sibling_hash, hashv)
             index //= 2
         ensure(
             bytes(hashv) == bytes(expected_root_hash),
@@ -101,6 +103,12 @@ class AccumulatorProof:
             expected_root_hash
         )
 
+    # Verifies many elements against `expected_root_hash` at once, see `AccumulatorBatchVerifier`.
+    # `elements` are (proof, element_hash, element_index) tuples, returns whether each one verifies.
+    @classmethod
+    def verify_batch(cls, expected_root_hash: HashValue, elements) -> List[bool]:
+        return AccumulatorBatchVerifier(cls.hasher, expected_root_hash).verify_all(elements)
+
     @classmethod
     def from_proto(cls, proto):
         siblings = from_proto_siblings(proto.siblings, ACCUMULATOR_PLACEHOLDER_HASH)
@@ -122,6 +130,55 @@ class TestAccumulatorProof(AccumulatorProof):
     hasher = TestOnlyHasher
 
 
+# Verifies many `AccumulatorProof`s against the same `expected_root_hash`, like the proofs of a
+# page of events. Proofs of nearby leaves share most of their path to the root, so every node of
+# a path which verified is remembered by (depth, level, index), with the siblings from its level
+# up to the root. A later proof stops hashing at the first remembered node it reaches, its
+# remaining siblings then have to be the remembered ones.
+class AccumulatorBatchVerifier:
+    def __init__(self, hasher, expected_root_hash: HashValue):
+        self.state = hasher_state_of(hasher)
+        self.expected_root_hash = bytes(expected_root_hash)
+        self.verified = {}
+
+    # Returns whether `proof` verifies the element, like `AccumulatorProof.verify` without raising.
+    def verify(self, proof: AccumulatorProof, element_hash: HashValue, element_index: Uint64) -> bool:
+        siblings = [bytes(x) for x in proof.siblings]
+        depth = len(siblings)
+        if depth > MAX_ACCUMULATOR_PROOF_DEPTH:
+            return False
+        state = self.state
+        path = []
+        index = element_index
+        hashv = bytes(element_hash)
+        for level, sibling_hash in enumerate(siblings):
+            known = self.verified.get((depth, level, index))
+            if known is not None:
+                known_hash, known_siblings = known
+                if known_hash != hashv or siblings[level:] != known_siblings:
+                    return False
+                break
+            path.append((level, index, hashv, sibling_hash))
+            if index % 2 == 0:
+                hashv = hash_internal(state, hashv, sibling_hash)
+            else:
+                hashv = hash_internal(state, sibling_hash, hashv)
+            index //= 2
+        else:
+            if hashv != self.expected_root_hash:
+                return False
+        for level, index, node_hash, sibling_hash in path:
+            upper_siblings = siblings[level + 1:]
+            self.verified[(depth, level, index)] = (node_hash, [sibling_hash] + upper_siblings)
+            self.verified[(depth, level, index ^ 1)] = (sibling_hash, [node_hash] + upper_siblings)
+        return True
+
+    # `elements` are (proof, element_hash, element_index) tuples, returns whether each one verifies.
+    def verify_all(self, elements) -> List[bool]:
+        return [self.verify(proof, element_hash, element_index)
+                for proof, element_hash, element_index in elements]
+
+
 # A proof that can be used to authenticate an element in a Sparse Merkle Tree given trusted root
 # hash. For example, `TransactionInfoToAccountProof` can be constructed on top of this structure.
 @dataclass
@@ -172,13 +229,14 @@ class SparseMerkleProof:
     # If `element_blob` is present, verifies an element whose key is `element_key` and value is
     # `element_blob` exists in the Sparse Merkle Tree using the provided proof. Otherwise
     # verifies the proof is a valid non-inclusion proof that shows this key doesn't exist in the
-    # tree.
+    # tree. A `cache` spares hashing the nodes shared with the proofs verified before.
 
     def verify(
         self,
         expected_root_hash: HashValue,
         element_key: HashValue,
-        element_blob: Optional[AccountStateBlob]
+        element_blob: Optional[AccountStateBlob],
+        cache: Optional[SparseMerkleHashCache] = None
     ):
         ensure(
             len(self.siblings) <= HashValue.LENGTH_IN_BITS,
@@ -236,13 +294,20 @@ class SparseMerkleProof:
             current_hash = SparseMerkleLeafNode(key, value_hash).hash()
         else:
             current_hash = bytes(SPARSE_MERKLE_PLACEHOLDER_HASH)
-        iter_bits = bytes_to_bools(element_key)[0:len(self.siblings)]
-        zipped = zip(self.siblings, reversed(iter_bits))
-        for sibling_hash, bit in zipped:
-            if bit:
-                current_hash = SparseMerkleInternalNode(sibling_hash, current_hash).hash()
+        if cache is not None:
+            hash_node = cache.hash
+        else:
+            hash_node = partial(hash_internal, hasher_state_of(SparseMerkleInternalHasher))
+        # Siblings go from the bottom level up, the lowest of the first `len(self.siblings)` bits
+        # of the key tells the side of the bottom node.
+        element_key = bytes(element_key)
+        bits = int.from_bytes(element_key, 'big') >> (len(element_key) * 8 - len(self.siblings))
+        for sibling_hash in self.siblings:
+            if bits & 1:
+                current_hash = hash_node(sibling_hash, current_hash)
             else:
-                current_hash = SparseMerkleInternalNode(current_hash, sibling_hash).hash()
+                current_hash = hash_node(current_hash, sibling_hash)
+            bits >>= 1
         ensure(
             current_hash == bytes(expected_root_hash),
             "Root hashes do not match. Actual root hash: {}. Expected root hash: {}.",
@@ -346,6 +411,7 @@ class AccumulatorRangeProof:
         first_pos = Position.from_leaf_index(first_leaf_index)
         current_hashes = leaf_hashes.copy()
         parent_hashes = []
+        state = hasher_state_of(self.__class__.hasher)
 
         # Keep reducing the list of hashes by combining all the children pairs, until there is
         # only one hash left.
@@ -360,7 +426,7 @@ class AccumulatorRangeProof:
                 left_hash = self.left_siblings[left_sibling_iter]
                 left_sibling_iter += 1
                 right_hash = children_iter.__next__()
-                hashv = MerkleTreeInternalNode(left_hash, right_hash, self.__class__.hasher).hash()
+                hashv = hash_internal(state, left_hash, right_hash)
                 parent_hashes.append(hashv)
 
             # Next we take two children at a time and compute their parents.
@@ -368,7 +434,7 @@ class AccumulatorRangeProof:
                 if len(chunk) == 2:
                     left_hash = chunk[0]
                     right_hash = chunk[1]
-                    hashv = MerkleTreeInternalNode(left_hash, right_hash, self.__class__.hasher).hash()
+                    hashv = hash_internal(state, left_hash, right_hash)
                     parent_hashes.append(hashv)
                 else:
                     # Similarly, if the last position is a left child, it needs to be combined with a
@@ -376,7 +442,7 @@ class AccumulatorRangeProof:
                     left_hash = chunk[0]
                     right_hash = self.right_siblings[right_sibling_iter]
                     right_sibling_iter += 1
-                    hashv = MerkleTreeInternalNode(left_hash, right_hash, self.__class__.hasher).hash()
+                    hashv = hash_internal(state, left_hash, right_hash)
                     parent_hashes.append(hashv)
 
             first_pos = first_pos.parent()
@@ -460,6 +526,7 @@ class TransactionProof:
         transaction_hash: HashValue,
         event_root_hash: Optional[HashValue],
         transaction_version: Version,
+        verifier: Optional[AccumulatorBatchVerifier] = None,
     ):
         ensure(
             bytes(transaction_hash) == bytes(self.transaction_info.transaction_hash),
@@ -480,6 +547,7 @@ class TransactionProof:
             transaction_version,
             self.transaction_info,
             self.ledger_info_to_transaction_info_proof,
+            verifier,
         )
 
     @classmethod
@@ -513,12 +581,14 @@ class AccountStateProof:
         ledger_info: LedgerInfo,
         state_version: Version,
         account_address_hash: HashValue,
-        account_state_blob: Optional[AccountStateBlob]
+        account_state_blob: Optional[AccountStateBlob],
+        cache: Optional[SparseMerkleHashCache] = None
     ):
         self.transaction_info_to_account_proof.verify(
             self.transaction_info.state_root_hash,
             account_address_hash,
             account_state_blob,
+            cache,
         )
         verify_transaction_info(
             ledger_info,
@@ -559,7 +629,8 @@ class EventProof:
         ledger_info: LedgerInfo,
         event_hash: HashValue,
         transaction_version: Version,
-        event_version_within_transaction: Version
+        event_version_within_transaction: Version,
+        verifier: Optional[AccumulatorBatchVerifier] = None,
     ):
         self.transaction_info_to_event_proof.verify(
             self.transaction_info.event_root_hash,
@@ -571,6 +642,7 @@ class EventProof:
             transaction_version,
             self.transaction_info,
             self.ledger_info_to_transaction_info_proof,
+            verifier,
         )
 
     @classmethod
@@ -1,11 +1,12 @@
 from libra.rustlib import ensure
-from libra.proof.definition import EventProof
+from libra.proof.definition import EventProof, AccumulatorBatchVerifier
 from libra.contract_event import ContractEvent
 from libra.ledger_info import LedgerInfo
 from libra.event import EventKey
 from libra.transaction import Version
 from canoser import Uint64
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -24,6 +25,8 @@ class EventWithProof:
     # to the call site and is supposed to be informed by this struct, get it from the struct
     # itself, such as: `event_with_proof.event.access_path()`, `event_with_proof.event_index()`,
     # etc.
+    # Events of a page can share an `AccumulatorBatchVerifier` of the transaction accumulator of
+    # `ledger_info` as `verifier`.
     def verify(
         self,
         ledger_info: LedgerInfo,
@@ -31,6 +34,7 @@ class EventWithProof:
         sequence_number: Uint64,
         transaction_version: Version,
         event_index: Uint64,
+        verifier: Optional[AccumulatorBatchVerifier] = None,
     ):
         ensure(
             bytes(self.event.key) == bytes(event_key),
@@ -62,6 +66,7 @@ class EventWithProof:
             self.event.hash(),
             transaction_version,
             event_index,
+            verifier,
         )
 
     @classmethod
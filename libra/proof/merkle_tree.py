@@ -1,11 +1,43 @@
 from libra.hasher import (
-    HashValue, gen_hasher,
+    HashValue, gen_hasher, hasher_state_of,
     SparseMerkleInternalHasher, TransactionAccumulatorHasher,
     EventAccumulatorHasher, TestOnlyHasher)
 from dataclasses import dataclass, field
 from typing import Callable
 from canoser import Struct
 
+
+def hash_internal(hasher_state, left, right):
+    """Hash of an internal node whose children hash to `left` and `right` (bytes or memoryview).
+    `hasher_state` is the seeded state from `hasher_state_of`, it is copied and not updated.
+    """
+    shazer = hasher_state.copy()
+    shazer.update(left)
+    shazer.update(right)
+    return shazer.digest()
+
+
+class SparseMerkleHashCache:
+    """Remembers the hashes of sparse Merkle internal nodes by their children, so that proofs of
+    the same state tree, or of successive versions of it, do not hash the nodes they share again.
+    Holds up to `max_size` nodes, then starts over.
+    """
+
+    def __init__(self, max_size=65536):
+        self.state = hasher_state_of(SparseMerkleInternalHasher)
+        self.max_size = max_size
+        self.hashes = {}
+
+    def hash(self, left, right):
+        key = bytes(left) + bytes(right)
+        hashv = self.hashes.get(key)
+        if hashv is None:
+            if len(self.hashes) >= self.max_size:
+                self.hashes.clear()
+            hashv = self.hashes[key] = hash_internal(self.state, left, right)
+        return hashv
+
+
 @dataclass
 class MerkleTreeInternalNode:
     left_child: HashValue
@@ -13,10 +45,7 @@ class MerkleTreeInternalNode:
     hasher: Callable[[], object]  # = field(init=False)
 
     def hash(self):
-        shazer = self.hasher()
-        shazer.update(bytes(self.left_child))
-        shazer.update(bytes(self.right_child))
-        return shazer.digest()
+        return hash_internal(hasher_state_of(self.hasher), bytes(self.left_child), bytes(self.right_child))
 
 
 @dataclass
@@ -3,12 +3,15 @@ from libra.transaction import Version, TransactionInfo
 from libra.rustlib import ensure
 
 
-# Verifies that a given `transaction_info` exists in the ledger using provided proof.
+# Verifies that a given `transaction_info` exists in the ledger using provided proof. With a
+# `verifier` (an `AccumulatorBatchVerifier` of the transaction accumulator of `ledger_info`), the
+# proof goes through it, sharing its work with the other proofs of a page.
 def verify_transaction_info(
     ledger_info: LedgerInfo,
     transaction_version: Version,
     transaction_info: TransactionInfo,
-    ledger_info_to_transaction_info_proof  # : TransactionAccumulatorProof
+    ledger_info_to_transaction_info_proof,  # : TransactionAccumulatorProof
+    verifier=None  # : Optional[AccumulatorBatchVerifier]
 ):
     ensure(
         transaction_version <= ledger_info.version,
@@ -17,6 +20,13 @@ def verify_transaction_info(
         ledger_info.version,
     )
     transaction_info_hash = transaction_info.hash()
+    if verifier is not None:
+        ensure(
+            verifier.verify(ledger_info_to_transaction_info_proof, transaction_info_hash, transaction_version),
+            "Transaction info of version {} does not verify against the transaction accumulator.",
+            transaction_version,
+        )
+        return
     ledger_info_to_transaction_info_proof.verify(
         ledger_info.transaction_accumulator_hash,
         transaction_info_hash,
@@ -6,31 +6,35 @@ usize = Uint64
 
 
 def next_power_of_two(num):
-    for i in range(99999999):
-        pow2 = pow(2, i)
-        if num <= pow2:
-            return pow2
+    if num <= 1:
+        return 1
+    return 1 << (num - 1).bit_length()
 
 
 def is_power_of_two(num):
-    return next_power_of_two(num) == num
+    return num > 0 and num & (num - 1) == 0
 
 
+# These work on the magnitude of negative numbers, like `bin` does: trailing_zeros(~n) is the
+# number of trailing ones of n. trailing_zeros(0) is 1, the count of zeros in bin(0).
 def trailing_zeros(longint):
-    manipulandum = bin(longint)
-    return len(manipulandum) - len(manipulandum.rstrip('0'))
+    if longint == 0:
+        return 1
+    longint = abs(longint)
+    return (longint & -longint).bit_length() - 1
 
 
 def leading_zeros(longint, bitlen=64):
-    if longint == 0:
-        return bitlen
-    manipulandum = bin(longint)
-    assert manipulandum[0:2] == '0b'
-    return bitlen + 2 - len(manipulandum)
+    assert longint >= 0
+    return bitlen - longint.bit_length()
 
 
-def count_ones(num):
-    return bin(num)[2:].count('1')
+if hasattr(int, 'bit_count'):
+    def count_ones(num):
+        return num.bit_count()
+else:
+    def count_ones(num):
+        return bin(num).count('1')
 
 
 def resize_list(alist, size, value):
@@ -0,0 +1,76 @@
+import threading
+
+from libra import Address
+
+
+class AccountHistory:
+    """Transactions sent by one account, fetched page by page with get_account_transactions.
+    The transactions are kept in sequence number order. `fetch_more()` loads the next page and
+    `refresh()` only asks for transactions newer than the highest sequence number already fetched.
+    """
+
+    def __init__(self, client, address, page_size=100, include_events=False):
+        self.client = client
+        self.address = Address.normalize_to_bytes(address)
+        self.page_size = page_size
+        self.include_events = include_events
+        self.transactions = []
+        # Set to False once a short page shows that the history is complete up to now.
+        self.has_more = True
+        self.lock = threading.Lock()
+
+    @property
+    def next_sequence_number(self):
+        return len(self.transactions)
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __getitem__(self, index):
+        return self.transactions[index]
+
+    def fetch_page(self, start):
+        return self.client.get_account_transactions(self.address, start, self.page_size, self.include_events)
+
+    def fetch_next_page(self):
+        """Fetches the page after the last fetched transaction, without adding it.
+        Returns the start sequence number of the page and the transactions.
+        """
+        start = self.next_sequence_number
+        return (start, self.fetch_page(start))
+
+    def fetch_newer_pages(self):
+        """Fetches all pages after the last fetched transaction, without adding them."""
+        pages = []
+        start = self.next_sequence_number
+        while True:
+            txs = self.fetch_page(start)
+            pages.append((start, txs))
+            if len(txs) < self.page_size:
+                return pages
+            start += len(txs)
+
+    def count_new(self, start, txs):
+        # A page overlaps with what is already there if it was fetched concurrently.
+        if start > self.next_sequence_number:
+            return 0
+        return max(len(txs) - (self.next_sequence_number - start), 0)
+
+    def add(self, start, txs):
+        """Adds a page fetched from `start`, returns the transactions that were not there yet."""
+        with self.lock:
+            if len(txs) < self.page_size:
+                self.has_more = False
+            new_txs = txs[len(txs) - self.count_new(start, txs):]
+            self.transactions.extend(new_txs)
+            return new_txs
+
+    def fetch_more(self):
+        return self.add(*self.fetch_next_page())
+
+    def refresh(self):
+        """Fetches all transactions newer than the last fetched one, returns them."""
+        ret = []
+        for start, txs in self.fetch_newer_pages():
+            ret.extend(self.add(start, txs))
+        return ret
@@ -0,0 +1,106 @@
+import logging
+import threading
+
+from libra import Address
+from libra_client.error import AccountError
+
+logger = logging.getLogger(__name__)
+
+
+def account_snapshot(state):
+    if state is None:
+        return None
+    return (state.sequence_number, state.balances)
+
+
+class AccountRefresher:
+    """Polls the state of a set of accounts every `interval` seconds on a background thread.
+    All accounts are read with one batched request per poll. Subscribers are called with
+    `(address, old_state, new_state)` only when the sequence number or the balances of an
+    account changed. A state is None if the account does not exist.
+    Callbacks run on the refresher thread.
+    """
+
+    def __init__(self, client, addresses=(), interval=10):
+        self.client = client
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.addresses = [Address.normalize_to_bytes(x) for x in addresses]
+        self.states = {}
+        self.callbacks = []
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def set_addresses(self, addresses):
+        with self.lock:
+            self.addresses = [Address.normalize_to_bytes(x) for x in addresses]
+            self.states = {k: v for k, v in self.states.items() if k in self.addresses}
+
+    def add(self, address):
+        address = Address.normalize_to_bytes(address)
+        with self.lock:
+            if address not in self.addresses:
+                self.addresses.append(address)
+
+    def remove(self, address):
+        address = Address.normalize_to_bytes(address)
+        with self.lock:
+            if address in self.addresses:
+                self.addresses.remove(address)
+            self.states.pop(address, None)
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+
+    def get_state(self, address):
+        return self.states.get(Address.normalize_to_bytes(address))
+
+    def refresh(self):
+        """Polls all accounts once, notifies subscribers and returns the changed addresses."""
+        with self.lock:
+            addresses = list(self.addresses)
+        if not addresses:
+            return []
+        calls = self.client.get_account_states(addresses)
+        changed = []
+        for address, call in zip(addresses, calls):
+            try:
+                state = call.result()
+            except AccountError:
+                state = None
+            except Exception as err:
+                logger.warning("refreshing %s failed: %r", address.hex(), err)
+                continue
+            with self.lock:
+                if address not in self.addresses:
+                    continue
+                known = address in self.states
+                old_state = self.states.get(address)
+                self.states[address] = state
+            if known and account_snapshot(old_state) == account_snapshot(state):
+                continue
+            changed.append(address)
+            for callback in self.callbacks:
+                callback(address, old_state, state)
+        return changed
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="AccountRefresher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.refresh()
+            except Exception as err:
+                logger.warning("refreshing accounts failed: %r", err)
+            self.stop_event.wait(self.interval)
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import os
+from canoser import Uint64
+
+from libra import Address
+from libra.transaction import RawTransaction, SignedTransaction, Script, TransactionPayload
+from libra_client.client import (
+    Client, DictObj, NETWORKS, to_account_state, to_transactions, events_params, to_events)
+from libra_client.error import (
+    AccountError, TransactionError, VMError, LibraError, LibraNetError, TransactionTimeoutError,
+    SequenceNumberUnknownError)
+from libra_client.json_codec import json_loads
+from libra_client.retry import READ_METHODS
+from libra_client.single_flight import AsyncSingleFlight
+from libra_client.sequence_number import SequenceNumberManager, is_sequence_number_error
+
+try:
+    import aiohttp
+except ModuleNotFoundError:
+    aiohttp = None
+
+
+class AsyncClient:
+    """asyncio version of `Client`.
+    All sessions share one aiohttp connection pool, and at most `max_concurrency` requests are
+    in flight at the same time. It must be used from a single event loop.
+    """
+
+    def __init__(self, network="testnet", waypoint=None, **kwargs):
+        if network == "mainnet":
+            raise LibraNetError("Mainnet is not supported currently")
+        if network != "testnet":
+            raise LibraNetError(f"Unknown network: {network}")
+        if 'TESTNET_LOCAL' in os.environ:
+            self.url = os.environ['TESTNET_LOCAL']
+        else:
+            self.url = NETWORKS[network]['url']
+        self.do_init(waypoint, **kwargs)
+
+    def do_init(self, waypoint=None, pool_maxsize=100, pool_maxsize_per_host=0, max_concurrency=100, coalesce=True):
+        if aiohttp is None:
+            raise ModuleNotFoundError("AsyncClient requires aiohttp: python3 -m pip install aiohttp")
+        self.timeout = 30
+        self.rpcid = 1
+        self.pool_maxsize = pool_maxsize
+        self.pool_maxsize_per_host = pool_maxsize_per_host
+        self.max_concurrency = max_concurrency
+        self.wait_interval = 1
+        # The on-chain number is fetched asynchronously in submit_payload whenever the manager does
+        # not know it, see `seed`.
+        self.sequence_numbers = SequenceNumberManager(None)
+        # Concurrent identical reads share one request.
+        self.single_flight = AsyncSingleFlight() if coalesce else None
+        # Created lazily, so that they are bound to the running event loop.
+        self.session = None
+        self.semaphore = None
+
+    @classmethod
+    def new(cls, url, waypoint=None, **kwargs):
+        ret = cls.__new__(cls)
+        ret.url = url
+        ret.do_init(waypoint, **kwargs)
+        return ret
+
+    def get_session(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize, limit_per_host=self.pool_maxsize_per_host)
+            self.session = aiohttp.ClientSession(connector=connector)
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def json_rpc(self, method, params):
+        if self.single_flight is None or method not in READ_METHODS:
+            return await self.send_json_rpc(method, params)
+        return await self.single_flight.do((method, tuple(params)), lambda: self.send_json_rpc(method, params))
+
+    async def send_json_rpc(self, method, params):
+        cur_id = self.next_rpcid()
+        ret = await self.post_json_rpc(Client.json_rpc_request(method, params, cur_id))
+        return Client.json_rpc_result(ret, cur_id)
+
+    def next_rpcid(self):
+        cur_id = self.rpcid
+        self.rpcid += 1
+        return cur_id
+
+    async def post_json_rpc(self, payload):
+        headers = {'Content-Type': 'application/json'}
+        data = json.dumps(payload)
+        session = self.get_session()
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with self.semaphore:
+            async with session.post(self.url, data=data, headers=headers, timeout=timeout) as resp:
+                content = await resp.read()
+                if resp.status != 200:
+                    raise IOError(content.decode(errors='replace'))
+        return json_loads(content)
+
+    async def get_account_state(self, address, retry=False):
+        address = Address.normalize_to_bytes(address)
+        params = [address.hex()]
+        state = await self.json_rpc("get_account", params)
+        return to_account_state(address, state)
+
+    async def get_account_resource(self, address, retry=False):
+        return await self.get_account_state(address, retry)
+
+    async def get_sequence_number(self, address, retry=False):
+        try:
+            state = await self.get_account_resource(address, retry)
+            return state.sequence_number
+        except AccountError:
+            return 0
+
+    async def get_balance(self, address, retry=False):
+        try:
+            state = await self.get_account_state(address, retry)
+            if state.balances:
+                return state.balances[0]['amount']
+            else:
+                return 0
+        except AccountError:
+            return 0
+
+    async def get_balances(self, address, retry=False):
+        state = await self.get_account_state(address, retry)
+        return state.balances
+
+    async def get_currencies(self):
+        params = []
+        return DictObj(await self.json_rpc("get_currencies", params))
+
+    async def get_metadata(self):
+        params = [None]
+        return DictObj(await self.json_rpc("get_metadata", params))
+
+    async def get_latest_ledger_info(self):
+        return await self.get_metadata()
+
+    async def get_latest_transaction_version(self):
+        return (await self.get_latest_ledger_info()).version
+
+    async def get_transactions(self, start_version, limit=1, include_events=False):
+        params = [start_version, limit, include_events]
+        txs = await self.json_rpc("get_transactions", params)
+        return to_transactions(txs)
+
+    async def get_transaction(self, start_version, include_events=False):
+        txs = await self.get_transactions(start_version, 1, include_events)
+        if txs == []:
+            return None
+        else:
+            return txs[0]
+
+    async def get_account_transaction(self, address, sequence_number, include_events=False):
+        address = Address.normalize_to_bytes(address)
+        params = [address.hex(), sequence_number, include_events]
+        return DictObj.new(await self.json_rpc("get_account_transaction", params))
+
+    async def get_account_transactions(self, address, sequence_number_start, sequence_number_limit,
+                                       include_events=False):
+        address = Address.normalize_to_bytes(address)
+        params = [address.hex(), sequence_number_start, sequence_number_limit, include_events]
+        txs = await self.json_rpc("get_account_transactions", params)
+        return to_transactions(txs)
+
+    async def get_events(self, key, start_sequence_number, ascending=True, limit=1):
+        params = events_params(key, start_sequence_number, limit)
+        events = await self.json_rpc("get_events", params)
+        return to_events(events, ascending)
+
+    async def get_events_sent(self, address, start_sequence_number, ascending=True, limit=1):
+        key = (await self.get_account_state(address)).sent_events_key
+        return await self.get_events(key, start_sequence_number, ascending, limit)
+
+    async def get_events_received(self, address, start_sequence_number, ascending=True, limit=1):
+        key = (await self.get_account_state(address)).received_events_key
+        return await self.get_events(key, start_sequence_number, ascending, limit)
+
+    async def wait_for_transaction(self, address, sequence_number, expiration_time=Uint64.max_value):
+        max_iterations = 50
+        while max_iterations > 0:
+            await asyncio.sleep(self.wait_interval)
+            max_iterations -= 1
+            ret = await self.get_account_transaction(address, sequence_number, True)
+            if ret is not None:
+                major_status = ret.vm_status.type
+                if major_status != 'executed':
+                    from libra.vm_error import StatusCode
+                    raise VMError(major_status, StatusCode.get_name(major_status))
+                else:
+                    return
+        raise TransactionTimeoutError("wait_for_transaction timeout.")
+
+    async def transfer_coin(self, sender_account, receiver_address, micro_libra, **kwargs):
+        script = Script.gen_transfer_script(receiver_address, micro_libra, **kwargs)
+        payload = TransactionPayload('Script', script)
+        return await self.submit_payload(sender_account, payload, **kwargs)
+
+    async def submit_payload(self, sender_account, payload, **kwargs):
+        address = sender_account.address
+        try:
+            sequence_number = self.sequence_numbers.allocate(address)
+        except SequenceNumberUnknownError:
+            self.sequence_numbers.seed(address, await self.get_sequence_number(address, retry=True))
+            sequence_number = self.sequence_numbers.allocate(address)
+        raw_tx = RawTransaction.new_tx(address, sequence_number, payload, **kwargs)
+        signed_txn = SignedTransaction.gen_from_raw_txn(raw_tx, sender_account)
+        params = [signed_txn.serialize().hex()]
+        try:
+            ret = await self.json_rpc("submit", params)
+            if ret is not None:
+                raise TransactionError(ret)
+        except (LibraError, IOError) as err:
+            if is_sequence_number_error(err):
+                self.sequence_numbers.resync(address, sequence_number)
+            else:
+                self.sequence_numbers.release(address, sequence_number)
+            raise
+        self.sequence_numbers.submitted(address, sequence_number, raw_tx.expiration_time)
+        if 'is_blocking' in kwargs and bool(kwargs['is_blocking']):
+            sequence_number = raw_tx.sequence_number
+            expiration_time = raw_tx.expiration_time
+            try:
+                await self.wait_for_transaction(bytes(raw_tx.sender), sequence_number, expiration_time)
+            except VMError as err:
+                if is_sequence_number_error(err):
+                    self.sequence_numbers.resync(address, sequence_number)
+                else:
+                    self.sequence_numbers.finish(address, sequence_number)
+                raise
+            self.sequence_numbers.finish(address, sequence_number)
+        return signed_txn
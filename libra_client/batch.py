@@ -0,0 +1,141 @@
+from libra import Address
+from libra_client.client import (
+    DictObj, to_account_state, to_transactions, events_params, to_events)
+from libra_client.error import LibraError
+
+
+class BatchCall:
+    """One call of a json-rpc batch.
+    `result()` returns the converted result, or raises the error of this call only.
+    """
+
+    def __init__(self, method, params, convert):
+        self.method = method
+        self.params = params
+        self.convert = convert
+        self.id = None
+        self.done = False
+        self._result = None
+        self._error = None
+
+    def set_response(self, ret):
+        if 'error' in ret:
+            self._error = LibraError(ret)
+        else:
+            try:
+                self._result = self.convert(ret['result'])
+            except LibraError as err:
+                self._error = err
+        self.done = True
+
+    def set_error(self, error):
+        self._error = error
+        self.done = True
+
+    def result(self):
+        if not self.done:
+            raise LibraError(f"Batch call {self.method} is not executed.")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def exception(self):
+        return self._error
+
+
+class Batch:
+    """Packs many read calls into json-rpc 2.0 array payloads.
+
+        with client.batch() as batch:
+            state = batch.get_account_state(address)
+            txs = batch.get_transactions(0, 10)
+        state.result()
+
+    Calls are sent on `execute()` (or when leaving the `with` block), split into chunks of
+    `client.max_batch_size`, and responses are matched back to calls by id.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def add(self, method, params, convert=None):
+        if convert is None:
+            convert = _identity
+        call = BatchCall(method, params, convert)
+        self.calls.append(call)
+        return call
+
+    def get_account_state(self, address):
+        address = Address.normalize_to_bytes(address)
+        return self.add("get_account", [address.hex()], lambda state: to_account_state(address, state))
+
+    def get_account_transaction(self, address, sequence_number, include_events=False):
+        address = Address.normalize_to_bytes(address)
+        params = [address.hex(), sequence_number, include_events]
+        return self.add("get_account_transaction", params, DictObj.new)
+
+    def get_account_transactions(self, address, sequence_number_start, sequence_number_limit,
+                                 include_events=False):
+        address = Address.normalize_to_bytes(address)
+        params = [address.hex(), sequence_number_start, sequence_number_limit, include_events]
+        return self.add("get_account_transactions", params, to_transactions)
+
+    def get_transactions(self, start_version, limit=1, include_events=False):
+        params = [start_version, limit, include_events]
+        return self.add("get_transactions", params, to_transactions)
+
+    def get_events(self, key, start_sequence_number, ascending=True, limit=1):
+        params = events_params(key, start_sequence_number, limit)
+        return self.add("get_events", params, lambda events: to_events(events, ascending))
+
+    def get_metadata(self):
+        return self.add("get_metadata", [None], DictObj)
+
+    def get_currencies(self):
+        return self.add("get_currencies", [], DictObj)
+
+    def execute(self, retry=True):
+        calls = self.calls
+        self.calls = []
+        size = max(self.client.max_batch_size, 1)
+        for i in range(0, len(calls), size):
+            self._execute_chunk(calls[i:i + size], retry)
+        return calls
+
+    def _execute_chunk(self, calls, retry=True):
+        def post(endpoint, record):
+            # Ids are only set on the calls once a response is there, a hedged copy of the batch
+            # is sent with ids of its own.
+            ids = [self.client.next_rpcid() for _ in calls]
+            payload = [self.client.json_rpc_request(call.method, call.params, cur_id)
+                       for call, cur_id in zip(calls, ids)]
+            return (self.client.post_json_rpc(payload, endpoint, record), ids)
+
+        idempotent = all(self.client.retry_policy.is_idempotent(call.method) for call in calls)
+        rets, ids = self.client.call_with_retry(post, "batch", retry, idempotent)
+        for call, cur_id in zip(calls, ids):
+            call.id = cur_id
+        if not isinstance(rets, list):
+            # The whole batch is rejected, e.g. it exceeds the batch size limit of the node.
+            raise LibraError(rets)
+        responses = {ret.get('id'): ret for ret in rets}
+        for call in calls:
+            if call.id in responses:
+                call.set_response(responses[call.id])
+            else:
+                call.set_error(LibraError(f"Json rpc response of id {call.id} is missing."))
+
+    def __len__(self):
+        return len(self.calls)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+
+def _identity(result):
+    return result
@@ -0,0 +1,166 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from libra.transaction import RawTransaction, SignedTransaction, Script, TransactionPayload
+from libra_client.error import LibraError, TransactionError, VMError
+from libra_client.stats import summarize
+
+
+class TransferResult:
+    def __init__(self, sender, receiver, amount, sequence_number):
+        self.sender = sender
+        self.receiver = receiver
+        self.amount = amount
+        self.sequence_number = sequence_number
+        self.signed_txn = None
+        self.version = None
+        self.error = None
+        self.submitted_at = None
+        self.finished_at = None
+
+    @property
+    def success(self):
+        return self.error is None
+
+    @property
+    def latency(self):
+        if self.submitted_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.submitted_at
+
+    def __repr__(self):
+        return f"TransferResult({self.sender.hex()}, {self.sequence_number}, version={self.version}, " \
+            f"error={self.error!r})"
+
+
+class BulkTransferStats:
+    def __init__(self):
+        self.started_at = time.time()
+        self.finished_at = None
+        self.succeeded = 0
+        self.failed = 0
+        self.latencies = []
+
+    def add(self, result):
+        if result.success:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        if result.latency is not None:
+            self.latencies.append(result.latency)
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def throughput(self):
+        elapsed = self.elapsed
+        return self.succeeded / elapsed if elapsed > 0 else 0
+
+    def to_json_serializable(self):
+        return {
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+            "latency": summarize(self.latencies),
+        }
+
+
+class BulkTransfer:
+    """Pipelined submitter for many peer to peer transfers.
+
+        bulk = BulkTransfer(client, window=500)
+        for result in bulk.run([(sender_account, receiver_address, micro_libra), ...]):
+            ...
+        print(bulk.stats.to_json_serializable())
+
+    Sequence numbers are pre-assigned from `client.sequence_numbers`, transactions are signed on
+    `sign_workers` threads and submitted on `submit_workers` threads. At most `window`
+    transactions are submitted but not yet finished. With `confirm`, commits are waited for by
+    `client.confirmations`, which checks all pending transactions of a sender with one range query.
+    Results are yielded as soon as they are finished, not in input order.
+    """
+
+    def __init__(self, client, window=100, sign_workers=4, submit_workers=16, confirm=True, **kwargs):
+        self.client = client
+        self.window = window
+        self.sign_workers = sign_workers
+        self.submit_workers = submit_workers
+        self.confirm = confirm
+        self.kwargs = kwargs
+        self.stats = None
+
+    def run(self, transfers):
+        self.stats = BulkTransferStats()
+        submitting = set()
+        confirming = {}
+        with ThreadPoolExecutor(self.sign_workers) as signers, \
+                ThreadPoolExecutor(self.submit_workers) as submitters:
+            for sender, receiver, amount in transfers:
+                while len(submitting) + len(confirming) >= self.window:
+                    yield from self._drain(submitting, confirming)
+                submitting.add(self._start(signers, submitters, sender, receiver, amount))
+            while submitting or confirming:
+                yield from self._drain(submitting, confirming)
+        self.stats.finished_at = time.time()
+
+    def _start(self, signers, submitters, sender, receiver, amount):
+        sequence_number = self.client.sequence_numbers.allocate(sender.address)
+        result = TransferResult(sender.address, receiver, amount, sequence_number)
+        signing = signers.submit(self._sign, sender, receiver, amount, sequence_number)
+        return submitters.submit(self._submit, result, signing)
+
+    def _sign(self, sender, receiver, amount, sequence_number):
+        script = Script.gen_transfer_script(receiver, amount, **self.kwargs)
+        payload = TransactionPayload('Script', script)
+        raw_tx = RawTransaction.new_tx(sender.address, sequence_number, payload, **self.kwargs)
+        return SignedTransaction.gen_from_raw_txn(raw_tx, sender)
+
+    def _submit(self, result, signing):
+        try:
+            result.signed_txn = signing.result()
+            result.submitted_at = time.time()
+            ret = self.client.json_rpc("submit", [result.signed_txn.serialize().hex()])
+            if ret is not None:
+                raise TransactionError(ret)
+        except Exception as err:
+            result.error = err
+            try:
+                self.client.on_submit_error(result.sender, result.sequence_number, err)
+            except Exception as cleanup_err:
+                # Raised while handling `err`, which stays its __context__.
+                result.error = cleanup_err
+            return result
+        self.client.sequence_numbers.submitted(
+            result.sender, result.sequence_number, result.signed_txn.expiration_time)
+        return result
+
+    def _drain(self, submitting, confirming):
+        done, _ = wait(submitting | confirming.keys(), return_when=FIRST_COMPLETED)
+        for future in done:
+            if future in submitting:
+                submitting.discard(future)
+                result = future.result()
+                if result.success and self.confirm:
+                    confirmation = self.client.confirmations.watch(
+                        result.sender, result.sequence_number, result.signed_txn.expiration_time)
+                    confirming[confirmation] = result
+                else:
+                    yield self._finish(result)
+            else:
+                result = confirming.pop(future)
+                try:
+                    result.version = future.result().version
+                except LibraError as err:
+                    result.error = err
+                if result.success or isinstance(result.error, VMError):
+                    # Executed, a transaction which timed out stays pending until it expires.
+                    self.client.sequence_numbers.finish(result.sender, result.sequence_number)
+                yield self._finish(result)
+
+    def _finish(self, result):
+        result.finished_at = time.time()
+        self.stats.add(result)
+        return result
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds a result of each method stays valid. Methods not listed here are never cached.
+DEFAULT_TTLS = {
+    "get_currencies": 300,
+    "get_metadata": 1,
+    "get_account": 5,
+}
+
+# Results of these methods do not depend on the ledger version they were read at.
+VERSION_INDEPENDENT_METHODS = {"get_currencies"}
+
+
+class CacheEntry:
+    __slots__ = ('result', 'version', 'expires_at')
+
+    def __init__(self, result, version, expires_at):
+        self.result = result
+        self.version = version
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """LRU cache of results of read-only json-rpc methods.
+    An entry expires after the ttl of its method, and is dropped as soon as a response from a newer
+    ledger version is seen. Cached results are shared, they should not be modified.
+    """
+
+    def __init__(self, ttls=None, max_size=1024, clock=time.monotonic):
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls is not None:
+            self.ttls.update(ttls)
+        self.max_size = max_size
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.version = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(method, params):
+        return (method, tuple(params))
+
+    def is_cacheable(self, method):
+        return self.ttls.get(method, 0) > 0
+
+    def get(self, method, params, min_version=None):
+        """Returns (True, result) for a hit, (False, None) otherwise.
+        With `min_version`, entries read at an older or unknown ledger version are misses.
+        """
+        if not self.is_cacheable(method):
+            return (False, None)
+        key = self.key(method, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and min_version is not None and method not in VERSION_INDEPENDENT_METHODS \
+                    and (entry.version is None or entry.version < min_version):
+                self.misses += 1
+                return (False, None)
+            if entry is not None and entry.expires_at > self.clock():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return (True, entry.result)
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return (False, None)
+
+    def put(self, method, params, result, version=None):
+        if version is not None:
+            self.observe_version(version)
+        if not self.is_cacheable(method):
+            return
+        key = self.key(method, params)
+        with self.lock:
+            if version is not None and version < self.version and method not in VERSION_INDEPENDENT_METHODS:
+                return
+            self.entries[key] = CacheEntry(result, version, self.clock() + self.ttls[method])
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def observe_version(self, version):
+        with self.lock:
+            if version <= self.version:
+                return
+            self.version = version
+            stale = [k for k, v in self.entries.items()
+                     if k[0] not in VERSION_INDEPENDENT_METHODS and (v.version is None or v.version < version)]
+            for key in stale:
+                del self.entries[key]
+
+    def invalidate(self, method=None, params=None):
+        with self.lock:
+            if method is None:
+                self.entries.clear()
+            elif params is None:
+                for key in [k for k in self.entries if k[0] == method]:
+                    del self.entries[key]
+            else:
+                self.entries.pop(self.key(method, params), None)
@@ -1,5 +1,9 @@
 import requests
+from requests.adapters import HTTPAdapter
+import threading
 import time
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
 from canoser import Uint64
 import os
 import json
@@ -7,7 +11,16 @@ import json
 from libra import Account, Address, AccountConfig
 from libra.transaction import (
     RawTransaction, SignedTransaction, Script, TransactionPayload)
-from libra_client.error import AccountError, TransactionError, VMError, LibraError, LibraNetError, TransactionTimeoutError
+from libra_client.error import (
+    AccountError, TransactionError, VMError, LibraError, LibraNetError, TransactionTimeoutError, HttpStatusError,
+    StaleResponseError)
+from libra_client.json_codec import json_loads, iter_json_rpc_result
+from libra_client.confirmation import ConfirmationEngine
+from libra_client.sequence_number import SequenceNumberManager, is_sequence_number_error
+from libra_client.retry import RetryPolicy, CircuitBreaker, RetryMetrics, call_with_retry, record_outcome
+from libra_client.endpoints import EndpointPool
+from libra_client.instrumentation import RpcRecord
+from libra_client.single_flight import SingleFlight
 
 NETWORKS = {
     'testnet': {
@@ -19,21 +32,47 @@ NETWORKS = {
 
 
 class DictObj:
+    """Attribute access view over a parsed json dict.
+    Nested dicts are wrapped only when they are accessed, lists are returned as they are.
+    Setting an attribute writes through to the underlying dict.
+    """
+    __slots__ = ('_dict',)
+
     def __init__(self, _dict):
-        for key in _dict:
-            value = _dict[key]
-            if type(value) == dict:
-                value = DictObj(value)
-            setattr(self, key, value)
+        object.__setattr__(self, '_dict', _dict)
+
+    def __getattr__(self, key):
+        try:
+            value = self._dict[key]
+        except KeyError:
+            raise AttributeError(key) from None
+        if type(value) == dict:
+            return DictObj(value)
+        return value
+
+    def __setattr__(self, key, value):
+        self._dict[key] = value
+
+    def __delattr__(self, key):
+        try:
+            del self._dict[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def __dir__(self):
+        return list(self._dict.keys())
+
+    def __reduce__(self):
+        return (DictObj, (self._dict,))
 
     def __str__(self):
-        return self.__dict__.__str__()
+        return self._dict.__str__()
 
     def __repr__(self):
-        return self.__dict__.__repr__()
+        return self._dict.__repr__()
 
     def to_json_serializable(self):
-        return self.__dict__
+        return self._dict
 
     @staticmethod
     def new(_dict):
@@ -42,8 +81,37 @@ class DictObj:
         return DictObj(_dict)
 
 
+def to_account_state(address, state):
+    if state is None:
+        raise AccountError(address)
+    return DictObj(state)
+
+
+def to_transaction(tx):
+    tx = DictObj(tx)
+    tx.success = (tx.vm_status.type == 'executed')
+    return tx
+
+
+def to_transactions(txs):
+    return [to_transaction(tx) for tx in txs]
+
+
+def events_params(key, start_sequence_number, limit):
+    limit = Uint64.int_safe(limit)
+    if limit == 0:
+        raise ValueError(f"limit:{limit} is invalid.")
+    return [key, start_sequence_number, limit]
+
+
+def to_events(events, ascending=True):
+    if not ascending:
+        events = reversed(events)
+    return [DictObj(ev) for ev in events]
+
+
 class Client:
-    def __init__(self, network="testnet", faucet_file=None, waypoint=None):
+    def __init__(self, network="testnet", faucet_file=None, waypoint=None, **kwargs):
         if network == "mainnet":
             raise LibraNetError("Mainnet is not supported currently")
         if network != "testnet":
@@ -52,13 +120,58 @@ class Client:
             self.url = os.environ['TESTNET_LOCAL']
         else:
             self.url = NETWORKS[network]['url']
-        self.do_init(faucet_file, waypoint)
+        self.do_init(faucet_file, waypoint, **kwargs)
 
-    def do_init(self, faucet_file=None, waypoint=None):
+    def do_init(self, faucet_file=None, waypoint=None, pool_connections=4, pool_maxsize=10, pool_block=False,
+                max_batch_size=20, cache=None, retry_policy=None, breaker_factory=CircuitBreaker, urls=None,
+                max_lag=100, read_your_writes=False, instrumentation=None, coalesce=True):
         self.init_faucet_account(faucet_file)
+        self.init_session(pool_connections, pool_maxsize, pool_block)
+        # `url` is the primary endpoint, `urls` optionally lists all the nodes requests are spread over.
+        self.endpoints = EndpointPool(urls or [self.url], max_lag, breaker_factory=breaker_factory)
+        self.hedge_executor = None
+        self.hedge_workers = pool_maxsize
+        self.hedge_lock = threading.Lock()
+        # When set, reads never answer from a ledger version older than one already seen.
+        self.read_your_writes = read_your_writes
+        # An optional Instrumentation receiving an RpcRecord per call.
+        self.instrumentation = instrumentation
+        # Concurrent identical reads share one request.
+        self.single_flight = SingleFlight() if coalesce else None
         self.timeout = 30
         self.rpcid = 1
-        self.verbose = True
+        self.rpcid_lock = threading.Lock()
+        self.max_batch_size = max_batch_size
+        # An optional ResponseCache for read-only methods.
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_metrics = RetryMetrics()
+        # Event keys of an account never change, so they are kept for get_events_sent/received,
+        # for at most as many accounts as the cache holds entries, least recently used dropped first.
+        self.event_keys = OrderedDict()
+        self.event_keys_lock = threading.Lock()
+        self.max_event_keys = cache.max_size if cache is not None else 1024
+        self.sequence_numbers = SequenceNumberManager(self.fetch_sequence_number)
+        self.confirmations = ConfirmationEngine(self)
+
+    def init_session(self, pool_connections, pool_maxsize, pool_block):
+        # pool_connections is the number of hosts kept alive (json-rpc node, faucet...),
+        # pool_maxsize is the number of keep-alive connections per host.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        if self.hedge_executor is not None:
+            self.hedge_executor.shutdown(wait=False)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def init_faucet_account(self, faucet_file):
         if self.is_testnet():
@@ -71,40 +184,222 @@ class Client:
         return self.url == NETWORKS['testnet']['url']
 
     @classmethod
-    def new(cls, url, faucet_file=None, waypoint=None):
+    def new(cls, url, faucet_file=None, waypoint=None, **kwargs):
+        """`url` is the url of a node, or a list of urls of several nodes."""
+        if not isinstance(url, str):
+            kwargs['urls'] = list(url)
+            url = kwargs['urls'][0]
         ret = cls.__new__(cls)
         ret.url = url
-        ret.do_init(faucet_file)
+        ret.do_init(faucet_file, waypoint, **kwargs)
         return ret
 
-    def json_rpc(self, method, params):
-        headers = {'Content-Type': 'application/json'}
-        cur_id = self.rpcid
-        payload = {
+    @property
+    def ledger_version(self):
+        """The highest ledger version a node answered from."""
+        return self.endpoints.highest_version()
+
+    def json_rpc(self, method, params, retry=True, min_version=None):
+        """With `min_version`, a response from an older ledger version is retried on another node."""
+        if min_version is None and self.read_your_writes and self.retry_policy.is_idempotent(method):
+            min_version = self.ledger_version
+        if min_version is not None:
+            retry = True
+        if self.cache is not None:
+            hit, result = self.cache.get(method, params, min_version)
+            if hit:
+                return result
+        if self.single_flight is None or not self.retry_policy.is_idempotent(method):
+            return self.send_json_rpc(method, params, retry, min_version)
+        key = (method, tuple(params), min_version)
+        return self.single_flight.do(key, lambda: self.send_json_rpc(method, params, retry, min_version))
+
+    def send_json_rpc(self, method, params, retry=True, min_version=None):
+        def post(endpoint, record):
+            # Every attempt gets a new id, a late response of a previous one can't be mistaken for it.
+            cur_id = self.next_rpcid()
+            ret = self.post_json_rpc(self.json_rpc_request(method, params, cur_id), endpoint, record)
+            version = ret.get('libra_ledger_version')
+            if min_version is not None and version is not None and version < min_version:
+                raise StaleResponseError(f"{endpoint.url} answered {method} from version {version} < {min_version}")
+            return (ret, cur_id)
+
+        ret, cur_id = self.call_with_retry(post, method, retry, min_version=min_version)
+        result = self.json_rpc_result(ret, cur_id)
+        if self.cache is not None:
+            self.cache.put(method, params, result, ret.get('libra_ledger_version'))
+        return result
+
+    def call_with_retry(self, fn, method, retry=True, idempotent=None, min_version=None):
+        """Calls `fn(endpoint, record)`, `record` is the RpcRecord to pass to `post_json_rpc`.
+        Reads go to the best endpoint, are hedged and fail over to the other endpoints; other calls
+        go to the pinned endpoint.
+        """
+        if idempotent is None:
+            idempotent = self.retry_policy.is_idempotent(method)
+        record = None
+        if self.instrumentation is not None:
+            record = RpcRecord(method)
+
+        def send(endpoint):
+            if record is not None:
+                record.attempts += 1
+            try:
+                ret = fn(endpoint, record)
+            except Exception as err:
+                record_outcome(endpoint, err)
+                raise
+            record_outcome(endpoint)
+            return ret
+
+        if idempotent:
+            select = lambda tried: self.endpoints.select(tried, min_version)
+            call = lambda endpoint: self.hedged_call(send, method, endpoint)
+        else:
+            select = self.endpoints.select_pinned
+            call = send
+        if record is None:
+            return call_with_retry(call, method, self.retry_policy, self.retry_metrics, select, retry, idempotent)
+        try:
+            return call_with_retry(call, method, self.retry_policy, self.retry_metrics, select, retry, idempotent)
+        except Exception as err:
+            record.error = type(err).__name__
+            raise
+        finally:
+            self.instrumentation.export(record)
+
+    def hedged_call(self, fn, method, endpoint):
+        delay = self.endpoints.hedge_delay(endpoint)
+        hedge = None
+        if delay is not None:
+            hedge = self.endpoints.select([endpoint])
+        if hedge is None or not hedge.is_available():
+            return fn(endpoint)
+        executor = self.get_hedge_executor()
+        started = threading.Event()
+
+        def first_call():
+            started.set()
+            return fn(endpoint)
+
+        first = executor.submit(first_call)
+        # Time spent queued behind other calls in the executor does not make the request slow.
+        started.wait()
+        try:
+            return first.result(delay)
+        except FutureTimeoutError:
+            pass
+        self.retry_metrics.incr("hedges", method)
+        second = executor.submit(fn, hedge)
+        done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+        future = done.pop()
+        if future.exception() is None:
+            return future.result()
+        other = second if future is first else first
+        return other.result()
+
+    def get_hedge_executor(self):
+        with self.hedge_lock:
+            if self.hedge_executor is None:
+                self.hedge_executor = ThreadPoolExecutor(self.hedge_workers, thread_name_prefix="hedge")
+            return self.hedge_executor
+
+    def next_rpcid(self):
+        with self.rpcid_lock:
+            cur_id = self.rpcid
+            self.rpcid += 1
+            return cur_id
+
+    @staticmethod
+    def json_rpc_request(method, params, cur_id):
+        return {
             "jsonrpc": "2.0",
             "method": method,
             "params": params,
             "id": cur_id,
         }
-        data = json.dumps(payload)
-        resp = requests.post(self.url, data=data, headers=headers, timeout=self.timeout)
-        if resp.status_code != 200:
-            raise IOError(resp.text)
-        ret = json.loads(resp.text)
-        if ret['id'] != cur_id:
-            raise f"Json rpc id mismatch: {ret['id']} - {cur_id}"
+
+    @staticmethod
+    def json_rpc_result(ret, cur_id):
+        if ret.get('id') != cur_id:
+            raise LibraError(f"Json rpc id mismatch: {ret.get('id')} - {cur_id}")
         if 'error' in ret:
             raise LibraError(ret)
-        self.rpcid += 1
         return ret['result']
 
-    def get_account_state(self, address, retry=False):
+    def post_json_rpc(self, payload, endpoint=None, record=None):
+        if endpoint is None:
+            endpoint = self.endpoints.primary
+        headers = {'Content-Type': 'application/json'}
+        data = json.dumps(payload)
+        start = time.monotonic()
+        resp = self.session.post(endpoint.url, data=data, headers=headers, timeout=self.timeout)
+        http_time = time.monotonic() - start
+        if resp.status_code != 200:
+            if record is not None:
+                record.add_exchange(endpoint.url, len(data), len(resp.content), http_time)
+            raise HttpStatusError(resp.status_code, resp.text)
+        endpoint.record_latency(http_time)
+        if record is None:
+            ret = json_loads(resp.content)
+        else:
+            start = time.monotonic()
+            ret = json_loads(resp.content)
+            record.add_exchange(endpoint.url, len(data), len(resp.content), http_time, time.monotonic() - start)
+        versions = [item['libra_ledger_version'] for item in (ret if isinstance(ret, list) else [ret])
+                    if isinstance(item, dict) and item.get('libra_ledger_version') is not None]
+        if versions:
+            endpoint.observe_version(max(versions))
+            if self.cache is not None:
+                # Batches and polls move the cache forward too, not only cached single reads.
+                self.cache.observe_version(max(versions))
+        return ret
+
+    def json_rpc_iter(self, method, params):
+        cur_id = self.next_rpcid()
+        headers = {'Content-Type': 'application/json'}
+        data = json.dumps(self.json_rpc_request(method, params, cur_id))
+        endpoint = self.endpoints.select()
+        with self.session.post(endpoint.url, data=data, headers=headers, timeout=self.timeout, stream=True) as resp:
+            if resp.status_code != 200:
+                raise HttpStatusError(resp.status_code, resp.text)
+            resp.raw.decode_content = True
+            yield from iter_json_rpc_result(resp.raw, cur_id)
+
+    def batch(self):
+        from libra_client.batch import Batch
+        return Batch(self)
+
+    def get_account_states(self, addresses, retry=False):
+        batch = self.batch()
+        for address in addresses:
+            batch.get_account_state(address)
+        return batch.execute(retry)
+
+    def get_account_state(self, address, retry=False, min_version=None):
         address = Address.normalize_to_bytes(address)
         params = [address.hex()]
-        state = self.json_rpc("get_account", params)
-        if state is None:
-            raise AccountError(address)
-        return DictObj(state)
+        state = self.json_rpc("get_account", params, retry, min_version)
+        state = to_account_state(address, state)
+        self.put_event_keys(address, (state.sent_events_key, state.received_events_key))
+        return state
+
+    def put_event_keys(self, address, keys):
+        with self.event_keys_lock:
+            self.event_keys[address] = keys
+            self.event_keys.move_to_end(address)
+            while len(self.event_keys) > self.max_event_keys:
+                self.event_keys.popitem(last=False)
+
+    def get_event_keys(self, address):
+        address = Address.normalize_to_bytes(address)
+        with self.event_keys_lock:
+            keys = self.event_keys.get(address)
+            if keys is not None:
+                self.event_keys.move_to_end(address)
+                return keys
+        state = self.get_account_state(address)
+        return (state.sent_events_key, state.received_events_key)
 
     def get_account_resource(self, address, retry=False):
         return self.get_account_state(address, retry)
@@ -116,9 +411,15 @@ class Client:
         except AccountError:
             return 0
 
-    def get_balance(self, address, retry=False):
+    def fetch_sequence_number(self, address):
+        # Always asks the chain, the allocator resyncs with it after sequence number errors.
+        if self.cache is not None:
+            self.cache.invalidate("get_account", [Address.normalize_to_bytes(address).hex()])
+        return self.get_sequence_number(address, retry=True)
+
+    def get_balance(self, address, retry=False, min_version=None):
         try:
-            state = self.get_account_state(address, retry)
+            state = self.get_account_state(address, retry, min_version)
             if state.balances:
                 return state.balances[0]['amount']
             else:
@@ -126,8 +427,8 @@ class Client:
         except AccountError:
             return 0
 
-    def get_balances(self, address, retry=False):
-        state = self.get_account_state(address, retry)
+    def get_balances(self, address, retry=False, min_version=None):
+        state = self.get_account_state(address, retry, min_version)
         return state.balances
 
     def get_currencies(self):
@@ -150,15 +451,55 @@ class Client:
     def get_latest_transaction_version(self):
         return self.get_latest_ledger_info().version
 
-    def get_transactions(self, start_version, limit=1, include_events=False):
+    def get_transactions(self, start_version, limit=1, include_events=False, min_version=None):
         params = [start_version, limit, include_events]
-        txs = self.json_rpc("get_transactions", params)
-        ret = []
-        for tx in txs:
-            tx = DictObj(tx)
-            tx.success = (tx.vm_status.type == 'executed')
-            ret.append(tx)
-        return ret
+        txs = self.json_rpc("get_transactions", params, min_version=min_version)
+        return to_transactions(txs)
+
+    def stream_transactions(self, start_version, limit=1, include_events=False):
+        params = [start_version, limit, include_events]
+        for tx in self.json_rpc_iter("get_transactions", params):
+            yield to_transaction(tx)
+
+    def iter_transactions(self, start_version, end_version=None, page_size=100, prefetch=2,
+                          include_events=False, follow=False, poll_interval=1):
+        """Yields transactions from `start_version` to `end_version` (inclusive), page by page.
+        `prefetch` pages are fetched in the background while the current one is consumed.
+        Without `end_version` it stops at the latest version, unless `follow` is set, in which
+        case it keeps following the chain head and polls every `poll_interval` seconds.
+        """
+        if end_version is None and not follow:
+            end_version = self.get_latest_transaction_version()
+        next_version = start_version
+        pages = deque()
+        with ThreadPoolExecutor(max(prefetch, 1)) as executor:
+            try:
+                while True:
+                    while len(pages) < max(prefetch, 1) and (end_version is None or next_version <= end_version):
+                        limit = page_size
+                        if end_version is not None:
+                            limit = min(limit, end_version - next_version + 1)
+                        future = executor.submit(self.get_transactions, next_version, limit, include_events)
+                        pages.append((next_version, limit, future))
+                        next_version += limit
+                    if not pages:
+                        return
+                    page_version, limit, future = pages.popleft()
+                    txs = future.result()
+                    yield from txs
+                    if len(txs) < limit:
+                        # Reached the chain head, the pages prefetched after this one are not complete.
+                        for _version, _limit, prefetched in pages:
+                            prefetched.cancel()
+                        pages.clear()
+                        if not follow:
+                            return
+                        next_version = page_version + len(txs)
+                        if not txs:
+                            time.sleep(poll_interval)
+            finally:
+                for _version, _limit, prefetched in pages:
+                    prefetched.cancel()
 
     def get_transaction(self, start_version, include_events=False):
         txs = self.get_transactions(start_version, 1, include_events)
@@ -172,33 +513,24 @@ class Client:
         params = [address.hex(), sequence_number, include_events]
         return DictObj.new(self.json_rpc("get_account_transaction", params))
     
-    def get_account_transactions(self, address, sequence_number_start, sequence_number_limit, include_events=False):
+    def get_account_transactions(self, address, sequence_number_start, sequence_number_limit, include_events=False,
+                                 min_version=None):
         address = Address.normalize_to_bytes(address)
         params = [address.hex(), sequence_number_start, sequence_number_limit , include_events]
-        txs = self.json_rpc("get_account_transactions", params)
-        ret = []
-        for tx in txs:
-            tx = DictObj(tx)
-            tx.success = (tx.vm_status.type == 'executed')
-            ret.append(tx)
-        return ret
+        txs = self.json_rpc("get_account_transactions", params, min_version=min_version)
+        return to_transactions(txs)
 
     def get_events(self, key, start_sequence_number, ascending=True, limit=1):
-        limit = Uint64.int_safe(limit)
-        if limit == 0:
-            raise ValueError(f"limit:{limit} is invalid.")
-        params = [key, start_sequence_number, limit]
+        params = events_params(key, start_sequence_number, limit)
         events = self.json_rpc("get_events", params)
-        if not ascending:
-            events = reversed(events)
-        return [DictObj(ev) for ev in events]
+        return to_events(events, ascending)
 
     def get_events_sent(self, address, start_sequence_number, ascending=True, limit=1):
-        key = self.get_account_state(address).sent_events_key
+        key, _ = self.get_event_keys(address)
         return self.get_events(key, start_sequence_number, ascending, limit)
 
     def get_events_received(self, address, start_sequence_number, ascending=True, limit=1):
-        key = self.get_account_state(address).received_events_key
+        _, key = self.get_event_keys(address)
         return self.get_events(key, start_sequence_number, ascending, limit)
 
     def get_latest_events_sent(self, address, limit=1):
@@ -232,7 +564,7 @@ class Client:
             "auth_key": auth_key,
             "currency_code": "LBR",
         }
-        resp = requests.post(self.faucet_host, params=params, timeout=self.timeout)
+        resp = self.session.post(self.faucet_host, params=params, timeout=self.timeout)
         if resp.status_code != 200:
             raise IOError(
                 f"Faucet service {self.faucet_host} error: {resp.status_code}, {resp.text}"
@@ -242,33 +574,13 @@ class Client:
             self.wait_for_transaction(AccountConfig.testnet_dd_account_address(), sequence_number)
         return sequence_number
 
-    def wait_for_transaction(self, address, sequence_number, expiration_time=Uint64.max_value):  # noqa: C901
-        max_iterations = 50
-        if self.verbose:
-            address_hex = address
-            if isinstance(address_hex, bytes):
-                address_hex = address.hex()
-            print(f"waiting for {address_hex} with sequence number {sequence_number}", flush=True)
-        while max_iterations > 0:
-            time.sleep(1)
-            max_iterations -= 1
-            ret = self.get_account_transaction(address, sequence_number, True)
-            if ret is not None:
-                if self.verbose:
-                    print(f"\ntransaction {ret.version} is stored!")
-                if len(ret.events) == 0:
-                    if self.verbose:
-                        print("no events emitted")
-                major_status = ret.vm_status.type
-                if major_status != 'executed':
-                    from libra.vm_error import StatusCode
-                    raise VMError(major_status, StatusCode.get_name(major_status))
-                else:
-                    return
-            else:
-                if self.verbose:
-                    print(".", end='', flush=True)
-        raise TransactionTimeoutError("wait_for_transaction timeout.")
+    def wait_for_transaction(self, address, sequence_number, expiration_time=Uint64.max_value, timeout=50):
+        future = self.confirmations.watch(address, sequence_number, expiration_time)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise TransactionTimeoutError("wait_for_transaction timeout.")
 
     def transfer_coin(self, sender_account, receiver_address, micro_libra, **kwargs):
         script = Script.gen_transfer_script(receiver_address, micro_libra, **kwargs)
@@ -298,18 +610,37 @@ class Client:
         return self.submit_payload(self.faucet_account, payload, **kwargs)
 
     def submit_payload(self, sender_account, payload, **kwargs):
-        sequence_number = self.get_sequence_number(sender_account.address, retry=True)
-        # TODO: cache sequence_number
-        raw_tx = RawTransaction.new_tx(sender_account.address, sequence_number, payload, **kwargs)
+        address = sender_account.address
+        sequence_number = self.sequence_numbers.allocate(address)
+        raw_tx = RawTransaction.new_tx(address, sequence_number, payload, **kwargs)
         signed_txn = SignedTransaction.gen_from_raw_txn(raw_tx, sender_account)
         params = [signed_txn.serialize().hex()]
-        ret = self.json_rpc("submit", params)
-        if ret is not None:
-            raise TransactionError(ret)
+        try:
+            ret = self.json_rpc("submit", params)
+            if ret is not None:
+                raise TransactionError(ret)
+        except (LibraError, IOError) as err:
+            self.on_submit_error(address, sequence_number, err)
+            raise
+        self.sequence_numbers.submitted(address, sequence_number, raw_tx.expiration_time)
+        if self.cache is not None:
+            self.cache.invalidate("get_account", [address.hex()])
+        if 'is_blocking' in kwargs and bool(kwargs['is_blocking']):
+            sequence_number = raw_tx.sequence_number
+            expiration_time = raw_tx.expiration_time
+            try:
+                self.wait_for_transaction(bytes(raw_tx.sender), sequence_number, expiration_time)
+            except VMError as err:
+                if is_sequence_number_error(err):
+                    self.sequence_numbers.resync(address, sequence_number)
+                else:
+                    self.sequence_numbers.finish(address, sequence_number)
+                raise
+            self.sequence_numbers.finish(address, sequence_number)
+        return signed_txn
+
+    def on_submit_error(self, address, sequence_number, err):
+        if is_sequence_number_error(err):
+            self.sequence_numbers.resync(address, sequence_number)
         else:
-            if 'is_blocking' in kwargs and bool(kwargs['is_blocking']):
-                address = bytes(raw_tx.sender)
-                sequence_number = raw_tx.sequence_number
-                expiration_time = raw_tx.expiration_time
-                self.wait_for_transaction(address, sequence_number, expiration_time)
-            return signed_txn
+            self.sequence_numbers.release(address, sequence_number)
@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from canoser import Uint64
+
+from libra import Address
+from libra_client.error import VMError, TransactionTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# get_account_transactions returns at most this many transactions per call.
+MAX_ACCOUNT_TRANSACTIONS_LIMIT = 1000
+
+
+class PendingTransaction:
+    def __init__(self, address, sequence_number, expiration_time):
+        self.address = address
+        self.sequence_number = sequence_number
+        self.expiration_time = expiration_time
+        self.futures = []
+
+    @property
+    def key(self):
+        return (self.address, self.sequence_number)
+
+    def is_cancelled(self):
+        return all(future.cancelled() for future in self.futures)
+
+    def set_result(self, tx):
+        for future in self.futures:
+            if future.set_running_or_notify_cancel():
+                future.set_result(tx)
+
+    def set_exception(self, error):
+        for future in self.futures:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+
+class ConfirmationEngine:
+    """Waits for many submitted transactions at once on one background thread.
+
+    `watch(address, sequence_number)` returns a `concurrent.futures.Future` which resolves to the
+    committed transaction view, or fails with `VMError` if it was not executed, or with
+    `TransactionTimeoutError` once `expiration_time` (seconds) plus `expiration_grace` has passed.
+
+    Every poll sends one batch with a get_account_transactions range query per sender. The poll
+    interval starts at `min_interval` and backs off by `backoff` up to `max_interval` while
+    nothing commits, but never sleeps past the earliest expiration time.
+    """
+
+    def __init__(self, client, min_interval=0.1, max_interval=2, backoff=1.5, expiration_grace=5):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.expiration_grace = expiration_grace
+        self.interval = min_interval
+        self.cond = threading.Condition()
+        self.pending = {}
+        self.thread = None
+
+    def watch(self, address, sequence_number, expiration_time=Uint64.max_value, callback=None):
+        address = Address.normalize_to_bytes(address)
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        logger.debug("waiting for %s with sequence number %s", address.hex(), sequence_number)
+        with self.cond:
+            pending = self.pending.get((address, sequence_number))
+            if pending is None:
+                pending = PendingTransaction(address, sequence_number, expiration_time)
+                self.pending[pending.key] = pending
+            pending.futures.append(future)
+            self.interval = self.min_interval
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="ConfirmationEngine", daemon=True)
+                self.thread.start()
+            self.cond.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self.cond:
+                for key in [k for k, v in self.pending.items() if v.is_cancelled()]:
+                    del self.pending[key]
+                if not self.pending:
+                    self.thread = None
+                    return
+                pendings = list(self.pending.values())
+            started = time.time()
+            try:
+                finished = self.poll(pendings)
+            except Exception as err:
+                logger.warning("polling transactions failed: %r", err)
+                finished = []
+            with self.cond:
+                for pending, _outcome in finished:
+                    self.pending.pop(pending.key, None)
+                if finished:
+                    self.interval = self.min_interval
+                else:
+                    self.interval = min(self.interval * self.backoff, self.max_interval)
+            # Resolved once popped: a watch arriving from now on gets a PendingTransaction of its
+            # own, instead of adding a future to one which is already resolved.
+            for pending, outcome in finished:
+                if isinstance(outcome, Exception):
+                    pending.set_exception(outcome)
+                else:
+                    pending.set_result(outcome)
+            with self.cond:
+                self.cond.wait(self._sleep_time())
+            # New watches wake the thread up early, but polls stay at least min_interval apart.
+            remaining = started + self.min_interval - time.time()
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def _sleep_time(self):
+        if not self.pending:
+            return 0
+        deadline = min(x.expiration_time for x in self.pending.values()) + self.expiration_grace
+        return max(min(self.interval, deadline - time.time()), self.min_interval)
+
+    def poll(self, pendings):
+        """Returns (pending, outcome) pairs of the finished transactions, the outcome being the
+        committed transaction view or the error to fail its futures with.
+        """
+        by_sender = {}
+        for pending in pendings:
+            by_sender.setdefault(pending.address, []).append(pending)
+        batch = self.client.batch()
+        queries = []
+        for sender, items in by_sender.items():
+            start = min(x.sequence_number for x in items)
+            limit = max(x.sequence_number for x in items) - start + 1
+            limit = min(limit, MAX_ACCOUNT_TRANSACTIONS_LIMIT)
+            queries.append((items, batch.get_account_transactions(sender, start, limit)))
+        batch.execute()
+        now = time.time()
+        finished = []
+        for items, call in queries:
+            if call.exception() is not None:
+                logger.warning("polling transactions failed: %r", call.exception())
+                continue
+            txs = {tx.transaction.sequence_number: tx for tx in call.result()}
+            for pending in items:
+                tx = txs.get(pending.sequence_number)
+                if tx is not None:
+                    logger.debug("transaction %s is stored!", tx.version)
+                    if tx.success:
+                        finished.append((pending, tx))
+                    else:
+                        finished.append((pending, VMError(tx.vm_status.type, str(tx.vm_status))))
+                elif now > pending.expiration_time + self.expiration_grace:
+                    finished.append((pending, TransactionTimeoutError(
+                        f"transaction {pending.sequence_number} of {pending.address.hex()} expired.")))
+        return finished
@@ -0,0 +1,126 @@
+import threading
+from collections import deque
+
+from libra_client.retry import CircuitBreaker
+from libra_client.stats import percentile, summarize
+
+
+class Endpoint:
+    """One json-rpc node, with its recent latencies, the last ledger version it answered from
+    and its circuit breaker.
+    """
+
+    def __init__(self, url, breaker=None, window=100):
+        self.url = url
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = deque(maxlen=window)
+        self.ledger_version = None
+        self.lock = threading.Lock()
+
+    def record_latency(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def observe_version(self, version):
+        with self.lock:
+            if self.ledger_version is None or version > self.ledger_version:
+                self.ledger_version = version
+
+    def latency(self, p=50):
+        with self.lock:
+            latencies = list(self.latencies)
+        # An endpoint without samples is tried first, so that every endpoint gets measured.
+        return percentile(latencies, p) or 0
+
+    def sample_count(self):
+        return len(self.latencies)
+
+    def is_available(self):
+        return self.breaker.is_available()
+
+    def is_lagging(self, highest_version, max_lag):
+        if highest_version is None or self.ledger_version is None:
+            return False
+        return self.ledger_version + max_lag < highest_version
+
+    def is_behind(self, min_version):
+        if min_version is None or self.ledger_version is None:
+            return False
+        return self.ledger_version < min_version
+
+    def to_json_serializable(self):
+        with self.lock:
+            latencies = list(self.latencies)
+        return {
+            "url": self.url,
+            "ledger_version": self.ledger_version,
+            "circuit": self.breaker.state,
+            "latency": summarize(latencies),
+        }
+
+    def __repr__(self):
+        return f"Endpoint({self.url!r})"
+
+
+class EndpointPool:
+    """Routes requests over several nodes.
+    Reads go to the available endpoint with the lowest median latency among those which are not
+    more than `max_lag` versions behind the highest ledger version seen. Submissions are pinned to
+    one endpoint, and move to another one only when its circuit opens, so that transactions of
+    an account reach the mempool of the same node in order.
+    A read is hedged to a second endpoint when it takes longer than the `hedge_percentile`
+    latency of its endpoint, once `hedge_min_samples` latencies were recorded.
+    """
+
+    def __init__(self, urls, max_lag=100, hedge_percentile=95, hedge_min_samples=10, breaker_factory=CircuitBreaker):
+        if isinstance(urls, str):
+            urls = [urls]
+        if not urls:
+            raise ValueError("At least one endpoint url is required.")
+        self.endpoints = [Endpoint(url, breaker_factory()) for url in urls]
+        self.max_lag = max_lag
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.pinned = self.endpoints[0]
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def __iter__(self):
+        return iter(self.endpoints)
+
+    @property
+    def primary(self):
+        return self.endpoints[0]
+
+    def highest_version(self):
+        versions = [x.ledger_version for x in self.endpoints if x.ledger_version is not None]
+        return max(versions, default=None)
+
+    def select(self, exclude=(), min_version=None):
+        """Returns the best endpoint for a read which is not in `exclude`, None if there is none.
+        Endpoints last seen before `min_version` come after the others.
+        """
+        candidates = [x for x in self.endpoints if x not in exclude]
+        if not candidates:
+            return None
+        highest = self.highest_version()
+        return min(candidates, key=lambda x: (not x.is_available(), x.is_behind(min_version),
+                                              x.is_lagging(highest, self.max_lag), x.latency()))
+
+    def select_pinned(self, exclude=()):
+        """Returns the endpoint submissions are pinned to, None if it is in `exclude`."""
+        if not self.pinned.is_available():
+            self.pinned = self.select()
+        if self.pinned in exclude:
+            return None
+        return self.pinned
+
+    def hedge_delay(self, endpoint):
+        """Seconds to wait for `endpoint` before hedging a read, None to not hedge."""
+        if len(self.endpoints) < 2 or endpoint.sample_count() < self.hedge_min_samples:
+            return None
+        return endpoint.latency(self.hedge_percentile)
+
+    def to_json_serializable(self):
+        return [x.to_json_serializable() for x in self.endpoints]
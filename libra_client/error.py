@@ -37,3 +37,27 @@ class TransactionTimeoutError(LibraError):
 
 class LibraNetError(LibraError):
     pass
+
+
+class HttpStatusError(IOError):
+    @property
+    def status_code(self):
+        code, _ = self.args
+        return code
+
+    @property
+    def text(self):
+        _, text = self.args
+        return text
+
+
+class CircuitOpenError(IOError):
+    pass
+
+
+class StaleResponseError(LibraError):
+    pass
+
+
+class SequenceNumberUnknownError(LibraError):
+    pass
@@ -0,0 +1,187 @@
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+
+class RpcRecord:
+    """What one json-rpc call (or batch) cost. Times and sizes add up over all its attempts,
+    a hedged copy of a request counts as an attempt.
+    """
+    __slots__ = ('method', 'url', 'attempts', 'request_bytes', 'response_bytes', 'http_time', 'decode_time', 'error')
+
+    def __init__(self, method):
+        self.method = method
+        self.url = None
+        self.attempts = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.http_time = 0
+        self.decode_time = 0
+        self.error = None
+
+    @property
+    def retries(self):
+        return max(self.attempts - 1, 0)
+
+    def add_exchange(self, url, request_bytes, response_bytes, http_time, decode_time=0):
+        self.url = url
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        self.http_time += http_time
+        self.decode_time += decode_time
+
+    def to_json_serializable(self):
+        ret = {name: getattr(self, name) for name in self.__slots__}
+        ret['retries'] = self.retries
+        return ret
+
+
+class Instrumentation:
+    """Hands every RpcRecord of a client to its exporters.
+    A client without instrumentation (the default) does not build records at all.
+    """
+
+    def __init__(self, *exporters):
+        self.exporters = list(exporters)
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def export(self, record):
+        for exporter in self.exporters:
+            try:
+                exporter.export(record)
+            except Exception as err:
+                logger.warning("exporting rpc record with %r failed: %r", exporter, err)
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # The last bucket counts the values above every bound.
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the `p` percentile, inf if it is above every bound."""
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_json_serializable(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+class HistogramExporter:
+    """Keeps histograms of the times and sizes of the calls, and counts calls, retries and
+    errors, per method.
+    """
+    HISTOGRAMS = {
+        "http_time": TIME_BUCKETS,
+        "decode_time": TIME_BUCKETS,
+        "request_bytes": SIZE_BUCKETS,
+        "response_bytes": SIZE_BUCKETS,
+    }
+    COUNTERS = ("calls", "retries", "errors")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def export(self, record):
+        with self.lock:
+            if record.method not in self.histograms:
+                self.histograms[record.method] = {name: Histogram(bounds) for name, bounds in self.HISTOGRAMS.items()}
+                self.counters[record.method] = dict.fromkeys(self.COUNTERS, 0)
+            for name, histogram in self.histograms[record.method].items():
+                histogram.observe(getattr(record, name))
+            counters = self.counters[record.method]
+            counters["calls"] += 1
+            counters["retries"] += record.retries
+            if record.error is not None:
+                counters["errors"] += 1
+
+    def to_json_serializable(self):
+        with self.lock:
+            ret = {}
+            for method, histograms in self.histograms.items():
+                ret[method] = dict(self.counters[method])
+                for name, histogram in histograms.items():
+                    ret[method][name] = histogram.to_json_serializable()
+            return ret
+
+
+class LoggingExporter:
+    def __init__(self, logger=logger, level=logging.DEBUG):
+        self.logger = logger
+        self.level = level
+
+    def export(self, record):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        self.logger.log(
+            self.level, "rpc %s %s: attempts=%d request=%dB response=%dB http=%.2fms decode=%.2fms error=%s",
+            record.method, record.url, record.attempts, record.request_bytes, record.response_bytes,
+            record.http_time * 1000, record.decode_time * 1000, record.error)
+
+
+class PrometheusExporter(HistogramExporter):
+    """A HistogramExporter which renders its metrics in the Prometheus text format."""
+    UNITS = {
+        "http_time": ("http_seconds", "Time of the http requests of a call."),
+        "decode_time": ("decode_seconds", "Time decoding the json responses of a call."),
+        "request_bytes": ("request_bytes", "Size of the json-rpc requests of a call."),
+        "response_bytes": ("response_bytes", "Size of the json-rpc responses of a call."),
+    }
+
+    def __init__(self, prefix="libra_client_rpc"):
+        super().__init__()
+        self.prefix = prefix
+
+    def render(self):
+        lines = []
+        with self.lock:
+            methods = sorted(self.histograms)
+            for name, (unit, doc) in self.UNITS.items():
+                metric = f"{self.prefix}_{unit}"
+                lines.append(f"# HELP {metric} {doc}")
+                lines.append(f"# TYPE {metric} histogram")
+                for method in methods:
+                    histogram = self.histograms[method][name]
+                    cumulative = 0
+                    for bound, count in zip(self.HISTOGRAMS[name], histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{method="{method}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{method="{method}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{method="{method}"}} {histogram.sum}')
+                    lines.append(f'{metric}_count{{method="{method}"}} {histogram.count}')
+            for name in self.COUNTERS:
+                metric = f"{self.prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for method in methods:
+                    lines.append(f'{metric}{{method="{method}"}} {self.counters[method][name]}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,71 @@
+import json
+from decimal import Decimal
+
+from libra_client.error import LibraError
+
+# Optional faster backends, used when they are installed.
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ModuleNotFoundError:
+    ijson = None
+
+
+def json_loads(data):
+    """Parses json directly from the response bytes, without decoding them to a str first."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_json_rpc_result(fileobj, cur_id, chunk_size=64 * 1024):
+    """Yields the items of the `result` array of a json-rpc response one by one.
+    With ijson installed the response is parsed incrementally from `fileobj`, so a large page is
+    never held in memory as a whole. Otherwise it falls back to `json_loads`.
+    ijson is not asked for floats: its C backend then rejects integers above 2^63-1, and u64
+    values go up to 2^64-1. Its decimals are turned into floats here, like `json_loads` does.
+    """
+    if ijson is None:
+        ret = json_loads(fileobj.read())
+        if ret.get('id') != cur_id:
+            raise LibraError(f"Json rpc id mismatch: {ret.get('id')} - {cur_id}")
+        if 'error' in ret:
+            raise LibraError(ret)
+        yield from ret['result'] or []
+        return
+
+    ret = {}
+    builder = None
+    builder_prefix = None
+    for prefix, event, value in ijson.parse(fileobj, buf_size=chunk_size):
+        if event == 'number' and type(value) is Decimal:
+            value = float(value)
+        if builder is not None:
+            if prefix == builder_prefix and event in ('end_map', 'end_array'):
+                builder.event(event, value)
+                if builder_prefix == 'result.item':
+                    yield builder.value
+                else:
+                    ret[builder_prefix] = builder.value
+                builder = None
+            else:
+                builder.event(event, value)
+        elif prefix == 'id' and event == 'number':
+            ret['id'] = value
+            if value != cur_id:
+                raise LibraError(f"Json rpc id mismatch: {value} - {cur_id}")
+        elif prefix in ('result.item', 'error') and event in ('start_map', 'start_array'):
+            builder = ObjectBuilder()
+            builder_prefix = prefix
+            builder.event(event, value)
+        elif prefix == 'result.item':
+            yield value
+    if 'error' in ret:
+        raise LibraError(ret)
+    if ret.get('id') != cur_id:
+        raise LibraError(f"Json rpc id mismatch: {ret.get('id')} - {cur_id}")
@@ -22,8 +22,11 @@ def sha3_256_mod():
         return sha3.sha3_256
 
 
+SHA3_256 = sha3_256_mod()
+
+
 def new_sha3_256():
-    return sha3_256_mod()()
+    return SHA3_256()
 
 
 class KeyFactory:
@@ -40,12 +43,12 @@ class KeyFactory:
 
     def __init__(self, seed):
         MASTER_KEY_SALT = b"LIBRA WALLET: master key salt$"
-        self.master = hmac.new(MASTER_KEY_SALT, seed, digestmod=sha3_256_mod()).digest()
+        self.master = hmac.new(MASTER_KEY_SALT, seed, digestmod=SHA3_256).digest()
 
     # See https://github.com/casebeer/python-hkdf/blob/master/hkdf.py
 
     def _hkdf_expand(self, pseudo_random_key, info=b"", length=32):
-        shazer = sha3_256_mod()
+        shazer = SHA3_256
         hash_len = shazer().digest_size
         length = int(length)
         if length > 255 * hash_len:
@@ -0,0 +1,442 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+
+from libra import Address, AccountConfig
+from libra.event import EventKey
+from libra.transaction import SignedTransaction, Script
+
+CHAIN_ID = 2
+MAX_LIMIT = 1000
+# Transactions of an account further ahead of its sequence number are rejected, like by mempool.
+MAX_PENDING_PER_ACCOUNT = 100
+
+PEER_TO_PEER_SCRIPT = Script.get_script_bytecode("peer_to_peer_with_metadata")
+
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32001
+
+
+class JsonRpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(code, message)
+        self.code = code
+        self.message = message
+
+
+class MockAccount:
+    def __init__(self, address, balance=0, authentication_key=None):
+        self.address = address
+        self.balance = balance
+        self.sequence_number = 0
+        self.authentication_key = authentication_key
+        self.received_events_key = EventKey.new_from_address(address, 0)
+        self.sent_events_key = EventKey.new_from_address(address, 1)
+        # Versions of the transactions sent by this account, indexed by sequence number.
+        self.transactions = []
+        # Submitted transactions waiting for the ones before them, by sequence number.
+        self.pending = {}
+
+    def to_json_serializable(self):
+        return {
+            "address": self.address.hex(),
+            "balances": [{"amount": self.balance, "currency": AccountConfig.LBR_NAME}],
+            "sequence_number": self.sequence_number,
+            "authentication_key": self.authentication_key.hex() if self.authentication_key else None,
+            "sent_events_key": self.sent_events_key.hex(),
+            "received_events_key": self.received_events_key.hex(),
+            "delegated_key_rotation_capability": False,
+            "delegated_withdrawal_capability": False,
+            "is_frozen": False,
+            "role": {"type": "unknown"},
+        }
+
+
+class MockLedger:
+    """An in-memory chain which executes peer to peer transfers, in json-rpc format.
+    Accounts are created with `mint()`. A submitted transaction is executed at once when its
+    sequence number is the one of its sender, otherwise it waits for the transactions before it.
+    Gas is not charged.
+    """
+
+    def __init__(self, verify_signatures=True):
+        self.verify_signatures = verify_signatures
+        self.lock = threading.RLock()
+        self.accounts = {}
+        self.events = {}
+        self.transactions = [{
+            "version": 0,
+            "transaction": {"type": "genesis"},
+            "hash": "",
+            "events": [],
+            "vm_status": {"type": "executed"},
+            "gas_used": 0,
+        }]
+        self.timestamp = int(time.time() * 1000_000)
+
+    @property
+    def version(self):
+        return len(self.transactions) - 1
+
+    def get_or_create_account(self, address):
+        address = Address.normalize_to_bytes(address)
+        if address not in self.accounts:
+            self.accounts[address] = MockAccount(address)
+        return self.accounts[address]
+
+    def mint(self, address, amount, authentication_key=None):
+        """Creates the account if it does not exist and adds `amount` to its balance."""
+        with self.lock:
+            account = self.get_or_create_account(address)
+            account.balance += amount
+            if authentication_key is not None:
+                account.authentication_key = bytes(authentication_key)
+            return account
+
+    def get_account(self, address):
+        with self.lock:
+            account = self.accounts.get(Address.normalize_to_bytes(address))
+            if account is None:
+                return None
+            return account.to_json_serializable()
+
+    def get_metadata(self):
+        with self.lock:
+            return {"version": self.version, "timestamp": self.timestamp, "chain_id": CHAIN_ID}
+
+    def get_currencies(self):
+        return [{
+            "code": AccountConfig.LBR_NAME,
+            "scaling_factor": 1000000,
+            "fractional_part": 1000,
+            "to_lbr_exchange_rate": 1.0,
+            "mint_events_key": "",
+            "burn_events_key": "",
+            "preburn_events_key": "",
+            "cancel_burn_events_key": "",
+            "exchange_rate_update_events_key": "",
+        }]
+
+    def transaction_view(self, version, include_events):
+        tx = self.transactions[version]
+        if include_events:
+            return tx
+        return dict(tx, events=[])
+
+    def get_transactions(self, start_version, limit, include_events):
+        check_limit(limit)
+        with self.lock:
+            end = min(start_version + limit, len(self.transactions))
+            return [self.transaction_view(v, include_events) for v in range(start_version, end)]
+
+    def get_account_transaction(self, address, sequence_number, include_events):
+        with self.lock:
+            account = self.accounts.get(Address.normalize_to_bytes(address))
+            if account is None or sequence_number >= len(account.transactions):
+                return None
+            return self.transaction_view(account.transactions[sequence_number], include_events)
+
+    def get_account_transactions(self, address, start, limit, include_events):
+        check_limit(limit)
+        with self.lock:
+            account = self.accounts.get(Address.normalize_to_bytes(address))
+            if account is None:
+                return []
+            versions = account.transactions[start:start + limit]
+            return [self.transaction_view(v, include_events) for v in versions]
+
+    def get_events(self, key, start, limit):
+        check_limit(limit)
+        with self.lock:
+            return self.events.get(bytes.fromhex(key), [])[start:start + limit]
+
+    def submit(self, signed_txn_hex):
+        try:
+            txn = SignedTransaction.deserialize(bytes.fromhex(signed_txn_hex))
+        except Exception as err:
+            raise JsonRpcError(INVALID_PARAMS, f"Invalid params: {err}")
+        raw_txn = txn.raw_txn
+        if self.verify_signatures:
+            self.verify_signature(txn)
+        if raw_txn.expiration_time < time.time():
+            raise vm_validation_error("TRANSACTION_EXPIRED")
+        payload = raw_txn.payload
+        if not payload.Script or payload.value.code != PEER_TO_PEER_SCRIPT:
+            raise JsonRpcError(SERVER_ERROR, "Mock node only executes peer to peer transfers.")
+        with self.lock:
+            sender = self.accounts.get(bytes(raw_txn.sender))
+            if sender is None:
+                raise vm_validation_error("SENDING_ACCOUNT_DOES_NOT_EXIST")
+            if sender.authentication_key is not None \
+                    and sender.authentication_key != txn.authenticator.authentication_key():
+                raise vm_validation_error("INVALID_AUTH_KEY")
+            sequence_number = raw_txn.sequence_number
+            if sequence_number < sender.sequence_number:
+                raise vm_validation_error("SEQUENCE_NUMBER_TOO_OLD")
+            if sequence_number >= sender.sequence_number + MAX_PENDING_PER_ACCOUNT:
+                raise vm_validation_error("SEQUENCE_NUMBER_TOO_NEW")
+            if sequence_number in sender.pending:
+                raise JsonRpcError(SERVER_ERROR, "Mempool submission error: transaction already exists.")
+            sender.pending[sequence_number] = txn
+            while sender.sequence_number in sender.pending:
+                self.execute(sender, sender.pending.pop(sender.sequence_number))
+
+    @staticmethod
+    def verify_signature(txn):
+        message = hashlib.sha3_256(b"LIBRA::RawTransaction").digest() + txn.raw_txn.serialize()
+        try:
+            VerifyKey(txn.authenticator.public_key_bytes()).verify(message, txn.authenticator.signature_bytes())
+        except BadSignatureError:
+            raise vm_validation_error("INVALID_SIGNATURE")
+
+    def execute(self, sender, txn):
+        raw_txn = txn.raw_txn
+        receiver_address, amount, metadata, metadata_signature = [x.value for x in raw_txn.payload.value.args]
+        receiver_address = bytes(receiver_address)
+        metadata = bytes(metadata)
+        version = len(self.transactions)
+        receiver = self.accounts.get(receiver_address)
+        events = []
+        if receiver is None:
+            vm_status = {"type": "move_abort", "location": "00000000000000000000000000000001::LibraAccount",
+                         "abort_code": 5}
+        elif sender.balance < amount:
+            vm_status = {"type": "move_abort", "location": "00000000000000000000000000000001::LibraAccount",
+                         "abort_code": 10}
+        else:
+            vm_status = {"type": "executed"}
+            sender.balance -= amount
+            receiver.balance += amount
+            events.append(self.emit(sender.sent_events_key, version, {
+                "type": "sentpayment",
+                "amount": {"amount": amount, "currency": AccountConfig.LBR_NAME},
+                "receiver": receiver_address.hex(),
+                "metadata": metadata.hex(),
+            }))
+            events.append(self.emit(receiver.received_events_key, version, {
+                "type": "receivedpayment",
+                "amount": {"amount": amount, "currency": AccountConfig.LBR_NAME},
+                "sender": sender.address.hex(),
+                "metadata": metadata.hex(),
+            }))
+        authenticator = txn.authenticator
+        self.transactions.append({
+            "version": version,
+            "transaction": {
+                "type": "user",
+                "sender": sender.address.hex(),
+                "signature_scheme": "Scheme::Ed25519",
+                "signature": authenticator.signature_bytes().hex(),
+                "public_key": authenticator.public_key_bytes().hex(),
+                "sequence_number": raw_txn.sequence_number,
+                "chain_id": raw_txn.chain_id,
+                "max_gas_amount": raw_txn.max_gas_amount,
+                "gas_unit_price": raw_txn.gas_unit_price,
+                "gas_currency": raw_txn.gas_currency_code,
+                "expiration_timestamp_secs": raw_txn.expiration_time,
+                "script_hash": hashlib.sha3_256(PEER_TO_PEER_SCRIPT).hexdigest(),
+                "script": {
+                    "type": "peer_to_peer_transaction",
+                    "receiver": receiver_address.hex(),
+                    "amount": amount,
+                    "currency": AccountConfig.LBR_NAME,
+                    "metadata": metadata.hex(),
+                    "metadata_signature": bytes(metadata_signature).hex(),
+                },
+            },
+            "hash": txn.hash().hex(),
+            "events": events,
+            "vm_status": vm_status,
+            "gas_used": 0,
+        })
+        sender.transactions.append(version)
+        sender.sequence_number += 1
+        self.timestamp = max(self.timestamp + 1, int(time.time() * 1000_000))
+
+    def emit(self, key, version, data):
+        events = self.events.setdefault(key, [])
+        event = {"key": key.hex(), "sequence_number": len(events), "transaction_version": version, "data": data}
+        events.append(event)
+        return event
+
+
+def check_limit(limit):
+    if limit <= 0 or limit > MAX_LIMIT:
+        raise JsonRpcError(INVALID_PARAMS, f"Invalid params: limit {limit} is not in (0, {MAX_LIMIT}]")
+
+
+def vm_validation_error(status):
+    return JsonRpcError(SERVER_ERROR, f"Server error: VM Validation error: {status}")
+
+
+class MockNode:
+    """A local json-rpc node serving a `MockLedger`, for tests and benchmarks without network.
+
+        with MockNode(latency=0.01, error_rate=0.05, seed=1) as node:
+            node.ledger.mint(account.address, 1000)
+            client = Client.new(node.url, "mint.key")
+
+    Every http request is delayed by `latency` seconds, or a random delay between the two values
+    of a `(min, max)` tuple, and fails with `error_status` with probability `error_rate`.
+    `fail_next()` makes the next requests fail deterministically.
+    """
+
+    def __init__(self, ledger=None, latency=0, error_rate=0, error_status=503, max_batch_size=20, seed=None,
+                 host="127.0.0.1", port=0):
+        self.ledger = ledger or MockLedger()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.max_batch_size = max_batch_size
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.failures = []
+        self.requests = 0
+        self.address = (host, port)
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        if self.server is None:
+            self.server = ThreadingHTTPServer(self.address, make_handler(self))
+            self.server.daemon_threads = True
+            self.thread = threading.Thread(target=self.server.serve_forever, name="MockNode", daemon=True)
+            self.thread.start()
+        return self.url
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+            self.thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def fail_next(self, count=1, status=None):
+        with self.random_lock:
+            self.failures.extend([status or self.error_status] * count)
+
+    def delay(self):
+        if isinstance(self.latency, tuple):
+            low, high = self.latency
+            with self.random_lock:
+                return self.random.uniform(low, high)
+        return self.latency
+
+    def injected_error(self):
+        """Returns the http status the current request fails with, None if it does not fail."""
+        with self.random_lock:
+            self.requests += 1
+            if self.failures:
+                return self.failures.pop(0)
+            if self.error_rate and self.random.random() < self.error_rate:
+                return self.error_status
+        return None
+
+    def handle_payload(self, payload):
+        if isinstance(payload, list):
+            if not payload or len(payload) > self.max_batch_size:
+                return error_response(None, INVALID_REQUEST,
+                                      f"Invalid Request: batch size {len(payload)} is not in (0, {self.max_batch_size}]")
+            return [self.handle(request) for request in payload]
+        return self.handle(payload)
+
+    def handle(self, request):
+        cur_id = request.get('id') if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or not isinstance(request.get('params', []), list):
+                raise JsonRpcError(INVALID_REQUEST, "Invalid Request")
+            method = request.get('method')
+            handler = METHODS.get(method)
+            if handler is None:
+                raise JsonRpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+            try:
+                result = handler(self.ledger, *request.get('params', []))
+            except (TypeError, ValueError) as err:
+                raise JsonRpcError(INVALID_PARAMS, f"Invalid params: {err}")
+        except JsonRpcError as err:
+            return error_response(cur_id, err.code, err.message, self.ledger)
+        return dict(response_metadata(self.ledger), id=cur_id, result=result)
+
+
+METHODS = {
+    "get_account": lambda ledger, address: ledger.get_account(address),
+    "get_metadata": lambda ledger, version=None: ledger.get_metadata(),
+    "get_currencies": lambda ledger: ledger.get_currencies(),
+    "get_transactions": MockLedger.get_transactions,
+    "get_account_transaction": MockLedger.get_account_transaction,
+    "get_account_transactions": MockLedger.get_account_transactions,
+    "get_events": MockLedger.get_events,
+    "submit": MockLedger.submit,
+}
+
+
+def response_metadata(ledger):
+    with ledger.lock:
+        return {
+            "jsonrpc": "2.0",
+            "libra_chain_id": CHAIN_ID,
+            "libra_ledger_version": ledger.version,
+            "libra_ledger_timestampusec": ledger.timestamp,
+        }
+
+
+def error_response(cur_id, code, message, ledger=None):
+    ret = response_metadata(ledger) if ledger is not None else {"jsonrpc": "2.0"}
+    return dict(ret, id=cur_id, error={"code": code, "message": message, "data": None})
+
+
+def make_handler(node):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body leave in one segment, small responses don't wait for a delayed ack.
+        disable_nagle_algorithm = True
+        wbufsize = 64 * 1024
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            delay = node.delay()
+            if delay:
+                time.sleep(delay)
+            status = node.injected_error()
+            if status is not None:
+                self.reply(status, b"injected error")
+                return
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.reply(200, json.dumps(error_response(None, -32700, "Parse error")).encode())
+                return
+            self.reply(200, json.dumps(node.handle_payload(payload)).encode())
+
+        def reply(self, status, data):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
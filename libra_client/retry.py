@@ -0,0 +1,193 @@
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from libra_client.error import HttpStatusError, CircuitOpenError, StaleResponseError
+
+# Json-rpc methods which only read the chain, they can be sent again at any time.
+READ_METHODS = {
+    "get_account",
+    "get_account_transaction",
+    "get_account_transactions",
+    "get_transactions",
+    "get_events",
+    "get_metadata",
+    "get_currencies",
+    "get_account_state_with_proof",
+    "get_state_proof",
+}
+
+
+def is_transient_error(error):
+    """Errors of the transport or of an overloaded node, the request may succeed when sent again."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, HttpStatusError):
+        return error.status_code >= 500 or error.status_code == 429
+    return False
+
+
+def is_safe_to_resubmit(error):
+    """Errors which prove that a submitted transaction never reached the node."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, HttpStatusError):
+        return error.status_code in (429, 503)
+    return False
+
+
+class RetryPolicy:
+    """Retries read methods on transient errors, and any other method (submit) only on errors
+    showing the request was not processed. Sleeps between attempts grow exponentially from
+    `base_delay` up to `max_delay`, with full jitter.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=0.1, max_delay=5, read_methods=READ_METHODS):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.read_methods = read_methods
+
+    def is_idempotent(self, method):
+        return method in self.read_methods
+
+    def should_retry(self, error, attempt, idempotent):
+        if attempt + 1 >= self.max_attempts:
+            return False
+        if idempotent:
+            return is_transient_error(error) or isinstance(error, StaleResponseError)
+        return is_safe_to_resubmit(error)
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """Stops sending requests to an endpoint after `failure_threshold` transport failures in a row.
+    Once `reset_timeout` seconds passed, one probe request is let through; the circuit closes
+    again if it succeeds.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def is_open(self):
+        with self.lock:
+            return self.state == self.OPEN and self.clock() - self.opened_at < self.reset_timeout
+
+    def is_available(self):
+        """False while the circuit is open, or half open with its probe request outstanding."""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                return False
+            return self.state == self.CLOSED or self.clock() - self.opened_at >= self.reset_timeout
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class RetryMetrics:
+    """Counts calls, retries, failures and calls rejected by an open circuit, per method."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+
+    def incr(self, name, method):
+        with self.lock:
+            self.counters[(name, method)] += 1
+
+    def get(self, name, method=None):
+        with self.lock:
+            return sum(v for (n, m), v in self.counters.items() if n == name and method in (None, m))
+
+    def to_json_serializable(self):
+        ret = {}
+        with self.lock:
+            for (name, method), value in self.counters.items():
+                ret.setdefault(method, {})[name] = value
+        return ret
+
+
+def record_outcome(endpoint, err=None):
+    """Records on the circuit breaker of `endpoint` how its request ended, `err` if it failed."""
+    if err is not None and is_transient_error(err):
+        endpoint.breaker.record_failure()
+    else:
+        # The node answered, even if with an error.
+        endpoint.breaker.record_success()
+
+
+def call_with_retry(fn, method, policy, metrics, select, retry=True, idempotent=None):
+    """Calls `fn(endpoint)` through the circuit breaker of the endpoint, retrying it as allowed by
+    `policy` when `retry` is set. `select(tried)` returns the endpoint of the next attempt,
+    or None once every endpoint it would use was tried; the next round starts after a backoff.
+    An endpoint whose circuit refuses the call counts as tried, CircuitOpenError is raised when
+    every endpoint of a round refused it.
+    `fn` reports every request it sends with `record_outcome`, as a hedged call can be answered
+    by another endpoint than the one it was given.
+    """
+    if idempotent is None:
+        idempotent = policy.is_idempotent(method)
+    attempt = 0
+    rounds = 0
+    tried = []
+    refused = []
+    while True:
+        endpoint = select(tried)
+        if endpoint is None:
+            if len(refused) == len(tried):
+                urls = ", ".join(x.url for x in refused)
+                raise CircuitOpenError(f"Circuit of {urls} is open.")
+            time.sleep(policy.backoff(rounds))
+            rounds += 1
+            tried = []
+            refused = []
+            continue
+        if not endpoint.breaker.allow():
+            metrics.incr("circuit_open", method)
+            tried.append(endpoint)
+            refused.append(endpoint)
+            continue
+        metrics.incr("calls", method)
+        try:
+            ret = fn(endpoint)
+        except Exception as err:
+            if not retry or not policy.should_retry(err, attempt, idempotent):
+                metrics.incr("failures", method)
+                raise
+            metrics.incr("retries", method)
+            tried.append(endpoint)
+            attempt += 1
+            continue
+        return ret
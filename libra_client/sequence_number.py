@@ -0,0 +1,145 @@
+import threading
+import time
+
+from libra import Address
+from libra_client.error import SequenceNumberUnknownError
+
+SEQUENCE_NUMBER_ERRORS = ["SEQUENCE_NUMBER_TOO_OLD", "SEQUENCE_NUMBER_TOO_NEW", "InvalidSeqNumber"]
+
+
+def is_sequence_number_error(error):
+    msg = str(error.args)
+    return any(name in msg for name in SEQUENCE_NUMBER_ERRORS)
+
+
+class SequenceNumberManager:
+    """Hands out sequence numbers of sender accounts locally.
+    The on-chain sequence number is fetched once per account with `fetch(address)`, after that
+    numbers are allocated without any rpc, so many transactions of one sender can be in flight.
+
+    A number is pending from its allocation until its transaction is finished, expires, or the
+    number is released. The chain is behind the pending numbers of an account, so it is never
+    refetched while there are any. A number released below pending ones leaves a gap instead,
+    which the next allocation fills so that the transactions after it can execute.
+
+    Without `fetch`, `allocate` raises SequenceNumberUnknownError for an account whose number is
+    not known, the caller fetches it and hands it over with `seed`.
+    """
+
+    def __init__(self, fetch, clock=time.time):
+        self.fetch = fetch
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.next_numbers = {}
+        # address -> {sequence number: expiration time, None until it is submitted}
+        self.pending = {}
+        self.gaps = {}
+        self.account_locks = {}
+
+    def _account_lock(self, address):
+        with self.lock:
+            if address not in self.account_locks:
+                self.account_locks[address] = threading.Lock()
+            return self.account_locks[address]
+
+    def _forget(self, address):
+        self.next_numbers.pop(address, None)
+        self.pending.pop(address, None)
+        self.gaps.pop(address, None)
+
+    def _expire(self, address):
+        pending = self.pending.get(address)
+        if not pending:
+            return
+        now = self.clock()
+        for sequence_number, expiration_time in list(pending.items()):
+            if expiration_time is not None and expiration_time < now:
+                del pending[sequence_number]
+        if not pending:
+            # Whatever was not committed by now never will be, ask the chain again.
+            self._forget(address)
+
+    def is_known(self, address):
+        address = Address.normalize_to_bytes(address)
+        return address in self.next_numbers
+
+    def seed(self, address, sequence_number):
+        address = Address.normalize_to_bytes(address)
+        with self._account_lock(address):
+            self.next_numbers.setdefault(address, sequence_number)
+
+    def allocate(self, address, count=1):
+        """Reserves `count` consecutive sequence numbers and returns the first one."""
+        address = Address.normalize_to_bytes(address)
+        with self._account_lock(address):
+            self._expire(address)
+            gaps = self.gaps.get(address)
+            if count == 1 and gaps:
+                sequence_number = min(gaps)
+                gaps.remove(sequence_number)
+            else:
+                if address not in self.next_numbers:
+                    if self.fetch is None:
+                        raise SequenceNumberUnknownError(f"Sequence number of {address.hex()} is not known.")
+                    self.next_numbers[address] = self.fetch(address)
+                sequence_number = self.next_numbers[address]
+                self.next_numbers[address] = sequence_number + count
+            pending = self.pending.setdefault(address, {})
+            for x in range(sequence_number, sequence_number + count):
+                pending[x] = None
+            return sequence_number
+
+    def submitted(self, address, sequence_number, expiration_time):
+        """The transaction of `sequence_number` is in the mempool, it stays pending until it is
+        finished or `expiration_time` passes.
+        """
+        address = Address.normalize_to_bytes(address)
+        with self._account_lock(address):
+            pending = self.pending.get(address)
+            if pending is not None and sequence_number in pending:
+                pending[sequence_number] = expiration_time
+
+    def finish(self, address, sequence_number):
+        """The transaction of `sequence_number` was executed (or failed after reaching the chain)."""
+        address = Address.normalize_to_bytes(address)
+        with self._account_lock(address):
+            pending = self.pending.get(address)
+            if pending is not None:
+                pending.pop(sequence_number, None)
+
+    def release(self, address, sequence_number):
+        """Gives back a number whose transaction was not submitted."""
+        address = Address.normalize_to_bytes(address)
+        with self._account_lock(address):
+            pending = self.pending.get(address, {})
+            pending.pop(sequence_number, None)
+            if address not in self.next_numbers:
+                return
+            gaps = self.gaps.setdefault(address, set())
+            gaps.add(sequence_number)
+            while self.next_numbers[address] - 1 in gaps:
+                self.next_numbers[address] -= 1
+                gaps.remove(self.next_numbers[address])
+            if gaps and not pending:
+                # Nothing after the gap is in flight any more, the chain knows best.
+                self._forget(address)
+
+    def resync(self, address, sequence_number=None):
+        """The transaction of `sequence_number` was rejected for its sequence number. The account
+        is refetched on its next allocation, once none of its numbers are pending.
+        """
+        address = Address.normalize_to_bytes(address)
+        with self._account_lock(address):
+            pending = self.pending.get(address, {})
+            pending.pop(sequence_number, None)
+            if not pending:
+                self._forget(address)
+
+    def reset(self, address=None):
+        with self.lock:
+            if address is None:
+                self.next_numbers.clear()
+                self.pending.clear()
+                self.gaps.clear()
+            else:
+                self._forget(Address.normalize_to_bytes(address))
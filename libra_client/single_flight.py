@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Runs one call per key at a time. Threads calling `do` with a key whose call is in flight
+    wait for it and get its result (or its exception) instead of starting another one.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as err:
+            self.finish(key)
+            future.set_exception(err)
+            raise
+        self.finish(key)
+        future.set_result(result)
+        return result
+
+    def finish(self, key):
+        # Calls starting from now on send a request of their own.
+        with self.lock:
+            del self.calls[key]
+
+
+class AsyncSingleFlight:
+    """asyncio version of `SingleFlight`, for coroutines of a single event loop.
+    The call runs in a task of its own, a waiter being cancelled does not cancel it.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.shared = 0
+
+    async def do(self, key, coro_fn):
+        task = self.calls.get(key)
+        if task is None:
+            task = self.calls[key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda _task: self.calls.pop(key, None))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
@@ -0,0 +1,21 @@
+import math
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of `values`, `p` in [0, 100]."""
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(math.ceil(p / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def summarize(values, ps=(50, 90, 99)):
+    ret = {"count": len(values)}
+    if values:
+        ret["min"] = min(values)
+        ret["max"] = max(values)
+        ret["mean"] = sum(values) / len(values)
+        for p in ps:
+            ret[f"p{p}"] = percentile(values, p)
+    return ret
@@ -23,40 +23,123 @@ import traceback, sys
 
 from libra_client.wallet_library import WalletLibrary
 from libra_client.client import Client
+from libra_client.account_history import AccountHistory
+from libra_client.account_refresher import AccountRefresher
+
+
+class WorkerSignals(QObject):
+    """
+    signals of a Worker, they are delivered on the UI thread
+    result: the return value of the task
+    error: (exception, traceback string)
+    progress: a message to show
+    """
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    progress = pyqtSignal(str)
+    finished = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """
+    runs fn(*args, **kwargs) on the thread pool
+    the result of a cancelled worker is dropped, a running rpc can not be interrupted
+    """
+    def __init__(self, fn, *args, **kwargs):
+        super(Worker, self).__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.error.emit((e, traceback.format_exc()))
+        else:
+            if not self.cancelled:
+                self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+class RefresherSignals(QObject):
+    """
+    forwards AccountRefresher callbacks to the UI thread
+    """
+    account_changed = pyqtSignal(object, object, object)
 
 
 class TransactionHistoryTableModel(QAbstractTableModel):
     """
     keep the method names
     they are an integral part of the model
+    rows are backed by an AccountHistory, pages are fetched when the view scrolls to the end
+    fetchMore only emits fetch_requested, the page is loaded on the thread pool and added with add_page
     """
-    def __init__(self, parent, MySnapshot_list, header, *args):
+    fetch_requested = pyqtSignal()
+
+    def __init__(self, parent, history, header, *args):
         QAbstractTableModel.__init__(self, parent, *args)
-        self.mylist = MySnapshot_list
-        self.header = ["Txid","From", "To", "Amount"]
+        self.history = history
+        self.header = header
 
     def rowCount(self, parent):
-        return len(self.mylist)
+        if parent.isValid():
+            return 0
+        return len(self.history)
 
     def columnCount(self, parent):
-        if len(self.mylist) > 0:
-            return len(self.mylist[0])
-        return 0
-        
+        if parent.isValid():
+            return 0
+        return len(self.header)
+
+    def row(self, tran):
+        return [tran.version, tran.transaction.sender, tran.transaction.script.receiver,
+                tran.transaction.script.amount]
+
     def data(self, index, role):
         if not index.isValid():
             return None
-        value = self.mylist[index.row()][index.column()]
-        if role == Qt.EditRole:
-            return value
-        elif role == Qt.DisplayRole:
-            return value
+        if role == Qt.EditRole or role == Qt.DisplayRole:
+            return self.row(self.history[index.row()])[index.column()]
 
     def headerData(self, col, orientation, role):
         if orientation == Qt.Horizontal and role == Qt.DisplayRole:
             return self.header[col]
         return None
 
+    def canFetchMore(self, parent):
+        if parent.isValid():
+            return False
+        return self.history.has_more
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        self.fetch_requested.emit()
+
+    def add_page(self, start, txs):
+        count = self.history.count_new(start, txs)
+        if count > 0:
+            first = len(self.history)
+            self.beginInsertRows(QModelIndex(), first, first + count - 1)
+            self.history.add(start, txs)
+            self.endInsertRows()
+        else:
+            self.history.add(start, txs)
+
+    def add_pages(self, pages):
+        for start, txs in pages:
+            self.add_page(start, txs)
+
 
 
 class MainWindow(QMainWindow):
@@ -90,9 +173,12 @@ class MainWindow(QMainWindow):
 
         balance_widget = self.create_balance_widget()
 
+        self.progress_label = QLabel("")
+
         layout.addWidget(file_widget)
         layout.addWidget(wallet_widget)
         layout.addWidget(balance_widget)
+        layout.addWidget(self.progress_label)
         
         self.w = QWidget()
         self.w.setLayout(layout)
@@ -100,15 +186,55 @@ class MainWindow(QMainWindow):
         self.w.setWindowTitle("Core Wallet")
         self.w.show()
 
+        self.threadPool = QThreadPool()
+        self.threadPool.setMaxThreadCount(8)
+        print("Multithreading with maximum %d threads" % self.threadPool.maxThreadCount())
+        # running workers by task key, a task is not started again while it is running
+        self.tasks = {}
+
         self.wallet =WalletLibrary.recover(self.file_name)
         ## libra testnet
         self.libra_client = Client("testnet") 
+        self.refresher = AccountRefresher(self.libra_client, interval=10)
+        self.refresher_signals = RefresherSignals()
+        self.refresher_signals.account_changed.connect(self.account_changed)
+        self.refresher.subscribe(self.refresher_signals.account_changed.emit)
         self.open_selected_wallet()
+        self.refresher.start()
+
+    def start_task(self, key, fn, *args, on_result=None, on_error=None, on_finished=None, progress=False):
+        if key in self.tasks:
+            return self.tasks[key]
+        worker = Worker(fn, *args)
+        if progress:
+            worker.kwargs['progress_callback'] = worker.signals.progress.emit
+            worker.signals.progress.connect(self.progress_label.setText)
+        if on_result is not None:
+            worker.signals.result.connect(on_result)
+        worker.signals.error.connect(on_error if on_error is not None else self.task_error)
+        worker.signals.finished.connect(lambda: self.task_finished(key, worker))
+        if on_finished is not None:
+            worker.signals.finished.connect(on_finished)
+        self.tasks[key] = worker
+        self.threadPool.start(worker)
+        return worker
+
+    def task_finished(self, key, worker):
+        if self.tasks.get(key) is worker:
+            del self.tasks[key]
+
+    def task_error(self, error):
+        e, trace = error
+        print(trace)
+        self.progress_label.setText("")
+        QMessageBox.about(self, "error", str(e))
+
+    def cancel_tasks(self):
+        for worker in self.tasks.values():
+            worker.cancel()
+        self.tasks = {}
+        self.progress_label.setText("")
 
-        self.threadPool = QThreadPool()
-        self.threadPool.setMaxThreadCount(8)
-        print("Multithreading with maximum %d threads" % self.threadPool.maxThreadCount())
-        
     def open_file(self):
         file_name_selected = QFileDialog.getOpenFileName(self, "QFileDialog.getOpenFileName()", "","key Files (*.key);;All Files (*)")
         file_name = file_name_selected[0]
@@ -182,10 +308,31 @@ class MainWindow(QMainWindow):
 
     
     def get_faucet_pressed(self):
-        self.libra_client.mint_coins(self.account.address, self.account.auth_key_prefix, 1_123_000, is_blocking=True)
-        balance0 = self.libra_client.get_balance(self.address, retry=True)
-        print('balance0 ',balance0)
-        self.balance_label.setText(str(balance0))
+        self.start_task("faucet", self.request_faucet, self.account, on_result=self.show_balance, progress=True)
+
+    def request_faucet(self, account, progress_callback):
+        progress_callback("Waiting for faucet ...")
+        self.libra_client.mint_coins(account.address, account.auth_key_prefix, 1_123_000, is_blocking=True)
+        progress_callback("")
+        return self.libra_client.get_balance(account.address, retry=True)
+
+    def update_balance(self):
+        self.start_task("balance", self.libra_client.get_balance, self.account.address, on_result=self.show_balance)
+
+    def account_changed(self, address, old_state, new_state):
+        if address != self.account.address:
+            return
+        if new_state is not None and new_state.balances:
+            self.show_balance(new_state.balances[0]['amount'])
+        else:
+            self.show_balance(0)
+        model = self.history_table.model()
+        if model is not None and old_state is not None and not model.history.has_more:
+            self.update_transaction_history()
+
+    def show_balance(self, balance):
+        print('balance0 ',balance)
+        self.balance_label.setText(str(balance))
 
     def send_asset_to_address(self):
         toaddress = self.send_address.text()
@@ -198,35 +345,47 @@ class MainWindow(QMainWindow):
         else:
             toamount = int(amountstr)
             print('From ', self.address, 'To ', toaddress, ' Amount:',toamount)
-            ret = self.libra_client.transfer_coin(self.account, toaddress, toamount, gas_unit_price=1, is_blocking=True)
-            balance0 = self.libra_client.get_balance(self.address, retry=True)
-            print('-- balance0 ',balance0)
-            QMessageBox.about(self,"info","send asset successful")
+            self.send_asset.setDisabled(True)
+            self.start_task("send", self.send_asset_task, self.account, toaddress, toamount,
+                            on_result=self.send_asset_done,
+                            on_finished=lambda: self.send_asset.setDisabled(False), progress=True)
+
+    def send_asset_task(self, account, toaddress, toamount, progress_callback):
+        progress_callback("Sending ...")
+        self.libra_client.transfer_coin(account, toaddress, toamount, gas_unit_price=1, is_blocking=True)
+        progress_callback("")
+        return self.libra_client.get_balance(account.address, retry=True)
+
+    def send_asset_done(self, balance):
+        print('-- balance0 ',balance)
+        self.balance_label.setText(str(balance))
+        QMessageBox.about(self,"info","send asset successful")
     
     def update_transaction_history(self):
-        #pass
         header = ["Txid","From", "To", "Amount"]
-        #get transaction history
-        ret_trans = self.libra_client.get_account_transactions(self.address, 0,1000)
-        self.all_transaction_history_list = []
-        for tran in ret_trans:
-            history_one = []
-            history_one.append(tran.version)
-            history_one.append(tran.transaction.sender)
-            history_one.append(tran.transaction.script.receiver)
-            history_one.append(tran.transaction.script.amount)
-            self.all_transaction_history_list.append(history_one)
-
-        this_tableModel = TransactionHistoryTableModel(None, self.all_transaction_history_list, header)
-        self.history_table.setModel(this_tableModel)
-        self.history_table.update()
-        if len(self.all_transaction_history_list) > 0:
-            header = self.history_table.horizontalHeader()       
-            header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
-            header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
-            header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
-            header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
-            
+        model = self.history_table.model()
+        if model is None or model.history.address != self.account.address:
+            history = AccountHistory(self.libra_client, self.account.address)
+            model = TransactionHistoryTableModel(None, history, header)
+            model.fetch_requested.connect(lambda: self.fetch_history_page(model))
+            model.rowsInserted.connect(self.resize_history_columns)
+            self.history_table.setModel(model)
+        if len(model.history) == 0:
+            self.fetch_history_page(model)
+        elif not model.history.has_more:
+            # only transactions newer than the last fetched one are requested
+            self.start_task("history", model.history.fetch_newer_pages, on_result=model.add_pages)
+        # otherwise the view fetches further pages itself when it is scrolled to the end
+
+    def fetch_history_page(self, model):
+        self.start_task("history", model.history.fetch_next_page, on_result=lambda page: model.add_page(*page))
+
+    def resize_history_columns(self):
+        header = self.history_table.horizontalHeader()       
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
 
     def tab_is_selected(self, index):
         print("tab is changed" + str(index))
@@ -287,10 +446,6 @@ class MainWindow(QMainWindow):
 
         #历史
         self.history_table  = QTableView()
-        header = ["Txid","From", "To", "Amount"]
-        self.all_transaction_history_list = []
-        this_tableModel = TransactionHistoryTableModel(None, self.all_transaction_history_list, header)
-        self.history_table.setModel(this_tableModel)
 
         self.account_tab_widget = QTabWidget()
         self.account_tab_widget.addTab(self.send_widget, "Send")
@@ -310,19 +465,23 @@ class MainWindow(QMainWindow):
     
     def open_selected_wallet(self):
         #假定暂时只有1个
+        self.cancel_tasks()
         self.account = self.wallet.accounts[0]
         self.address = self.account.address.hex()
         print('Account 0: \n Address:\t ',self.address)
-       
-        balance = self.libra_client.get_balance(self.account.address)
-        print(balance)
         
         self.address_label.setText(self.address)
-        self.balance_label.setText(str(balance))
+        self.balance_label.setText("...")
+        self.history_table.setModel(None)
+        self.refresher.set_addresses([x.address for x in self.wallet.accounts])
+        self.update_balance()
+        if self.account_tab_widget.currentIndex() == 1:
+            self.update_transaction_history()
 
 
 
 if __name__ == "__main__":
     app = QApplication([])
     window = MainWindow()
+    app.aboutToQuit.connect(window.refresher.stop)
     app.exec_()